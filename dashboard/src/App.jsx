@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import {
     Activity,
@@ -69,18 +69,40 @@ export default function App() {
     const [selectedInvoice, setSelectedInvoice] = useState(null);
     const [timeline, setTimeline] = useState([]);
     const [loading, setLoading] = useState(true);
+    const refreshTimer = useRef(null);
 
     useEffect(() => {
         fetchData();
-        const interval = setInterval(fetchData, 10000); // Auto refresh
-        return () => clearInterval(interval);
+
+        // Atualizações em tempo real via SSE (sem polling). Rajadas de eventos
+        // são agrupadas em uma única atualização.
+        const events = new EventSource('/api/dashboard/events');
+        events.addEventListener('status', (msg) => {
+            const event = JSON.parse(msg.data);
+            setInvoices((current) => current.map((inv) => (
+                inv.referencia === event.ref ? { ...inv, status: event.status } : inv
+            )));
+            clearTimeout(refreshTimer.current);
+            refreshTimer.current = setTimeout(fetchData, 500);
+        });
+        // Após uma reconexão, recarrega para não perder eventos do intervalo
+        let connected = false;
+        events.onopen = () => {
+            if (connected) fetchData();
+            connected = true;
+        };
+
+        return () => {
+            events.close();
+            clearTimeout(refreshTimer.current);
+        };
     }, []);
 
     const fetchData = async () => {
         try {
             const [statsRes, listRes] = await Promise.all([
-                axios.get('/nfse/dashboard/stats'),
-                axios.get('/nfse/dashboard/list?limit=10')
+                axios.get('/api/dashboard/stats'),
+                axios.get('/api/dashboard/list?limit=10')
             ]);
             setStats(statsRes.data);
             setInvoices(listRes.data);
@@ -92,7 +114,7 @@ export default function App() {
 
     const fetchTimeline = async (ref) => {
         try {
-            const res = await axios.get(`/nfse/${ref}/timeline`);
+            const res = await axios.get(`/api/dashboard/${ref}/timeline?include_data=false&limit=100`);
             setTimeline(res.data);
         } catch (err) {
             console.error("Erro ao buscar timeline", err);
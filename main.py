@@ -1,10 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
 from modules.focus_nfe.focus_client import _load_dotenv_if_present
 from modules.focus_nfe.router import router as focus_router
-from modules.focus_nfe.webhooks import router as webhook_router
-from fastapi.staticfiles import StaticFiles
-from modules.focus_nfe.database import init_db
+from modules.focus_nfe.webhooks import router as webhook_router, webhook_queue, document_queue
+from modules.focus_nfe.database import init_db, DatabaseCacheStore
+from modules.focus_nfe.cache import MUNICIPIO_CACHE
+from modules.focus_nfe.client_pool import focus_client_pool
+from modules.focus_nfe.metrics import CONTENT_TYPE, HTTP_REQUEST_SECONDS, REGISTRY
+from modules.focus_nfe.compression import CompressionMiddleware, PrecompressedStaticFiles
 import os
+import time
 import uvicorn
 
 app = FastAPI(
@@ -18,6 +23,71 @@ app = FastAPI(
 def on_startup():
     _load_dotenv_if_present()
     init_db()
+    if os.getenv("FOCUS_NFE_MUNICIPIO_CACHE_DB", "").lower() in ("1", "true", "sim", "yes"):
+        MUNICIPIO_CACHE.store = DatabaseCacheStore("municipios")
+
+@app.on_event("startup")
+async def start_webhook_workers():
+    # Workers da fila de webhooks (FOCUS_NFE_WEBHOOK_WORKERS=0 desativa neste processo)
+    webhook_queue.start()
+    # Workers dos downloads de PDF/XML das notas autorizadas (mesma variável de ativação)
+    document_queue.start()
+    # Fecha periodicamente os clientes Focus ociosos (tenants sem tráfego)
+    focus_client_pool.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await webhook_queue.stop()
+    await document_queue.stop()
+    await focus_client_pool.aclose()
+
+# Compressão (brotli/gzip) das respostas acima do limite; SSE e arquivos pré-comprimidos passam direto.
+# Registrada antes do middleware de métricas para ficar mais perto da aplicação: assim vê as respostas
+# inteiras (e não re-fatiadas pelo BaseHTTPMiddleware) ao aplicar o limite de tamanho.
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", 1024)))
+
+def _route_label(scope) -> str:
+    """
+    Template da rota atendida, com o prefixo do `include_router`/root_path
+    (ex: `/api/nfe/{ref}`). Arquivos estáticos viram `/storage/{path}`, rotas
+    do próprio framework (`/openapi.json`, `/docs`) usam o caminho fixo, e
+    caminhos sem rota, `not_found`.
+    """
+    route = scope.get("route")
+    if route is not None:
+        # Conforme a versão do FastAPI, a rota guarda o template com ou sem o prefixo do include_router:
+        # o prefixo é a parte inicial do caminho concreto que sobra além dos segmentos do template.
+        template = getattr(route, "path_format", route.path)
+        segments = scope["path"].rstrip("/").split("/")
+        depth = template.rstrip("/").count("/")
+        return "/".join(segments[: len(segments) - depth]) + template
+    if "app_root_path" in scope:
+        # Mount (StaticFiles): root_path é o prefixo da montagem
+        return f"{scope['root_path']}/{{path}}"
+    if scope.get("endpoint") is not None:
+        return scope["path"]
+    return "not_found"
+
+# Métricas de latência por rota (template, não o caminho concreto)
+@app.middleware("http")
+async def record_request_timing(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=_route_label(request.scope),
+            status=status,
+        )
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
 
 # Root endpoint
 @app.get("/")
@@ -31,13 +101,18 @@ app.include_router(webhook_router, prefix="/api")
 # Serve Storage (PDFs/XMLs)
 if not os.path.exists("storage"):
     os.makedirs("storage")
-app.mount("/storage", StaticFiles(directory="storage"), name="storage")
+app.mount("/storage", PrecompressedStaticFiles(directory="storage"), name="storage")
 
 # Serve Dashboard (Build folder)
 # Se a pasta dist existir, serve ela como root. Caso contrário, serve uma mensagem.
+# Os arquivos de assets/ têm hash no nome (Vite) e podem ficar em cache indefinidamente.
 DASHBOARD_PATH = "dashboard/dist"
 if os.path.exists(DASHBOARD_PATH):
-    app.mount("/dashboard", StaticFiles(directory=DASHBOARD_PATH, html=True), name="dashboard")
+    app.mount(
+        "/dashboard",
+        PrecompressedStaticFiles(directory=DASHBOARD_PATH, html=True, immutable_prefixes=("assets/",)),
+        name="dashboard",
+    )
 
 if __name__ == "__main__":
     import sys
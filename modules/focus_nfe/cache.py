@@ -0,0 +1,130 @@
+"""Cache em memória com TTL para respostas da Focus que quase nunca mudam."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Protocol, Tuple
+
+FRESH = "fresh"
+STALE = "stale"
+
+
+class CacheStore(Protocol):
+    """Persistência opcional do cache (ex: tabela no banco local)."""
+
+    def load(self, key: str) -> Optional[Tuple[Any, float]]: ...
+
+    def save(self, key: str, value: Any, stored_at: float) -> None: ...
+
+    def delete(self, key: Optional[str] = None) -> None: ...
+
+
+class TTLCache:
+    """
+    Cache LRU limitado a `maxsize` entradas. Uma entrada é "fresh" até `ttl`
+    segundos e "stale" por mais `stale_ttl` segundos: nesse intervalo ela
+    ainda pode ser servida enquanto é revalidada. Depois disso é descartada.
+
+    Se `store` for definido, as entradas também são gravadas nele e lidas de
+    lá quando não estão em memória (sobrevivem a reinícios do processo).
+    """
+
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float = 0.0, store: Optional[CacheStore] = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.store = store
+        self._data: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[Any, Optional[str]]:
+        """Retorna (valor, estado), com estado `FRESH`, `STALE` ou None (ausente)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+
+        if entry is None and self.store is not None:
+            entry = self.store.load(key)
+            if entry is not None:
+                self._remember(key, *entry)
+
+        if entry is None:
+            return None, None
+
+        value, stored_at = entry
+        age = time.time() - stored_at
+        if age <= self.ttl:
+            return value, FRESH
+        if age <= self.ttl + self.stale_ttl:
+            return value, STALE
+
+        self.invalidate(key)
+        return None, None
+
+    def set(self, key: str, value: Any) -> None:
+        stored_at = time.time()
+        self._remember(key, value, stored_at)
+        if self.store is not None:
+            self.store.save(key, value, stored_at)
+
+    def _remember(self, key: str, value: Any, stored_at: float) -> None:
+        with self._lock:
+            self._data[key] = (value, stored_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Remove uma entrada (ou todas, se `key` for None)."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+        if self.store is not None:
+            self.store.delete(key)
+
+    # Versões para código assíncrono: com `store` (banco), a leitura e a
+    # escrita rodam em uma thread, fora do event loop.
+
+    async def aget(self, key: str) -> Tuple[Any, Optional[str]]:
+        if self.store is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any) -> None:
+        if self.store is None:
+            self.set(key, value)
+        else:
+            await asyncio.to_thread(self.set, key, value)
+
+    async def ainvalidate(self, key: Optional[str] = None) -> None:
+        if self.store is None:
+            self.invalidate(key)
+        else:
+            await asyncio.to_thread(self.invalidate, key)
+
+    def begin_refresh(self, key: str) -> bool:
+        """Marca a chave como em revalidação. Retorna False se já estiver."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: str) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+
+MUNICIPIO_CACHE = TTLCache(
+    maxsize=int(os.environ.get("FOCUS_NFE_MUNICIPIO_CACHE_SIZE") or 1024),
+    ttl=float(os.environ.get("FOCUS_NFE_MUNICIPIO_CACHE_TTL_S") or 24 * 3600),
+    stale_ttl=float(os.environ.get("FOCUS_NFE_MUNICIPIO_CACHE_STALE_S") or 7 * 24 * 3600),
+)
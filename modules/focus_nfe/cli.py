@@ -19,12 +19,6 @@ def _load_json_file(path: str) -> Dict[str, Any]:
     return payload
 
 
-def _write_bytes(path: str, content: bytes) -> None:
-    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
-    with open(path, "wb") as f:
-        f.write(content)
-
-
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(prog="focus-nfe", description="CLI mínima para API Focus NFe")
     parser.add_argument("--base-url", default=os.getenv("FOCUS_NFE_BASE_URL"), help="Ex: https://api.focusnfe.com.br")
@@ -80,12 +74,11 @@ def main(argv: list[str] | None = None) -> int:
             return 0
 
         if args.cmd == "download":
-            response = client.download_document(args.doc, args.ref, args.format)
-            if not response.is_success:
-                print(f"ERRO: HTTP {response.status_code} - {response.text}", file=sys.stderr)
+            result = client.download_document_to(args.doc, args.ref, args.format, args.out)
+            if not result.ok:
+                print(f"ERRO: HTTP {result.status_code} - {result.error}", file=sys.stderr)
                 return 1
-            _write_bytes(args.out, response.content)
-            print(f"OK: salvo em {args.out}")
+            print(f"OK: salvo em {args.out} ({result.size} bytes, sha256 {result.sha256})")
             return 0
 
         print("ERRO: comando não implementado.", file=sys.stderr)
@@ -0,0 +1,193 @@
+"""Registro de clientes Focus de longa duração, compartilhados pelo processo."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from .focus_client import AsyncFocusNFeClient, resolve_credentials
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _env_bool(name: str) -> bool:
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "sim", "yes")
+
+
+@dataclass
+class _PoolEntry:
+    client: AsyncFocusNFeClient
+    last_used: float
+    leases: int = 0
+    evicted: bool = False
+
+
+class FocusClientPool:
+    """
+    Mantém um `AsyncFocusNFeClient` por (token, base_url), reaproveitando as
+    conexões keep-alive entre requisições em vez de abrir um novo
+    `httpx.AsyncClient` (com novo handshake TLS) a cada chamada.
+
+    - `max_tenants`: limite LRU de clientes mantidos em memória.
+    - `idle_ttl`: clientes sem uso há mais tempo que isso são fechados.
+    - `max_connections`/`max_keepalive`/`keepalive_expiry`: limites do pool
+      de conexões de cada cliente.
+    - `http2`/`max_streams`: multiplexa as requisições de cada tenant em
+      poucas conexões HTTP/2, com até `max_streams` streams por conexão.
+
+    Um cliente removido enquanto ainda está emprestado só é fechado quando o
+    último empréstimo termina. Os ociosos são fechados a cada empréstimo e,
+    com `start()`, também por uma task periódica (a cada `idle_ttl / 2`), para
+    que o cliente de um tenant sem tráfego não fique com conexões abertas.
+    """
+
+    def __init__(
+        self,
+        max_tenants: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        timeout: Optional[float] = None,
+        http2: Optional[bool] = None,
+        max_streams: Optional[int] = None,
+    ) -> None:
+        self.max_tenants = max_tenants or _env_int("FOCUS_NFE_POOL_MAX_TENANTS", 100)
+        self.idle_ttl = idle_ttl or _env_float("FOCUS_NFE_POOL_IDLE_TTL_S", 300.0)
+        self.limits = httpx.Limits(
+            max_connections=max_connections or _env_int("FOCUS_NFE_POOL_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=max_keepalive or _env_int("FOCUS_NFE_POOL_MAX_KEEPALIVE", 10),
+            keepalive_expiry=keepalive_expiry or _env_float("FOCUS_NFE_POOL_KEEPALIVE_EXPIRY_S", 60.0),
+        )
+        self.timeout = timeout or _env_float("FOCUS_NFE_TIMEOUT_S", 30.0)
+        self.http2 = http2 if http2 is not None else _env_bool("FOCUS_NFE_HTTP2")
+        self.max_streams = max_streams or _env_int("FOCUS_NFE_HTTP2_MAX_STREAMS", 100)
+        self._entries: "OrderedDict[Tuple[str, str], _PoolEntry]" = OrderedDict()
+        self._evictor: Optional[asyncio.Task] = None
+
+    def _create_client(self, token: str, base_url: str) -> AsyncFocusNFeClient:
+        return AsyncFocusNFeClient(
+            token=token,
+            base_url=base_url,
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=self.http2,
+            max_streams=self.max_streams,
+        )
+
+    def _acquire(self, token: Optional[str], base_url: Optional[str]) -> Tuple[_PoolEntry, List[_PoolEntry]]:
+        key = resolve_credentials(token, base_url)
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _PoolEntry(client=self._create_client(*key), last_used=now)
+            self._entries[key] = entry
+        self._entries.move_to_end(key)
+        entry.leases += 1
+        entry.last_used = now
+
+        return entry, self._collect_evictions(now)
+
+    def _collect_evictions(self, now: float) -> List[_PoolEntry]:
+        """Remove do registro os clientes ociosos e os excedentes do limite LRU."""
+        evicted: List[_PoolEntry] = []
+        for key, entry in list(self._entries.items()):
+            if entry.leases == 0 and now - entry.last_used > self.idle_ttl:
+                del self._entries[key]
+                evicted.append(entry)
+
+        while len(self._entries) > self.max_tenants:
+            _, entry = self._entries.popitem(last=False)
+            evicted.append(entry)
+
+        for entry in evicted:
+            entry.evicted = True
+        return [entry for entry in evicted if entry.leases == 0]
+
+    @asynccontextmanager
+    async def lease(self, token: Optional[str] = None, base_url: Optional[str] = None) -> AsyncIterator[AsyncFocusNFeClient]:
+        """
+        Empresta o cliente do token informado (ou do token padrão do .env).
+        O cliente não deve ser fechado nem ter o token alterado pelo chamador.
+        """
+        entry, to_close = self._acquire(token, base_url)
+        for stale in to_close:
+            await stale.client.aclose()
+        try:
+            yield entry.client
+        finally:
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+            if entry.evicted and entry.leases == 0:
+                await entry.client.aclose()
+
+    async def evict_idle(self) -> int:
+        """Fecha os clientes ociosos. Retorna quantos foram fechados."""
+        to_close = self._collect_evictions(time.monotonic())
+        for entry in to_close:
+            await entry.client.aclose()
+        return len(to_close)
+
+    def start(self) -> None:
+        """Inicia a limpeza periódica dos clientes ociosos no event loop atual."""
+        if self._evictor is None:
+            self._evictor = asyncio.create_task(self._evict_periodically())
+
+    async def _evict_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.idle_ttl / 2)
+            try:
+                await self.evict_idle()
+            except Exception:
+                logger.exception("Erro ao fechar clientes ociosos do pool")
+
+    async def aclose(self) -> None:
+        """Para a limpeza periódica e fecha todos os clientes (usado no shutdown da aplicação)."""
+        if self._evictor is not None:
+            self._evictor.cancel()
+            await asyncio.gather(self._evictor, return_exceptions=True)
+            self._evictor = None
+        entries = list(self._entries.values())
+        self._entries.clear()
+        for entry in entries:
+            entry.evicted = True
+            if entry.leases == 0:
+                await entry.client.aclose()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tenants": len(self._entries),
+            "leases": sum(entry.leases for entry in self._entries.values()),
+        }
+
+
+focus_client_pool = FocusClientPool()
+
+REGISTRY.gauge(
+    "focus_nfe_pool_tenants",
+    "Clientes Focus (tenants) mantidos no pool do processo.",
+).set_function(lambda: focus_client_pool.stats()["tenants"])
+REGISTRY.gauge(
+    "focus_nfe_pool_leases",
+    "Empréstimos de clientes do pool em andamento.",
+).set_function(lambda: focus_client_pool.stats()["leases"])
@@ -0,0 +1,328 @@
+"""
+Compressão das respostas HTTP.
+
+- `CompressionMiddleware`: negocia brotli (se o pacote `brotli` estiver
+  instalado) ou gzip para respostas acima de `minimum_size`. Streams SSE,
+  respostas já codificadas e formatos já comprimidos passam sem alteração.
+- `PrecompressedStaticFiles`: serve os irmãos `.br`/`.gz` gerados
+  previamente (`precompress_file`), sem comprimir a cada requisição, e aplica
+  cache longo e imutável nos arquivos com hash no nome.
+"""
+
+import asyncio
+import gzip
+import os
+import shutil
+import zlib
+from mimetypes import guess_type
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # Brotli é opcional; sem ele só gzip é negociado
+    import brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+# Streams SSE e formatos já comprimidos (`tipo/*` vale para todos os subtipos)
+EXCLUDED_CONTENT_TYPES = (
+    "text/event-stream",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "application/grpc",
+    "application/pdf",
+    "application/vnd.apache.parquet",
+    "audio/*",
+    "font/woff",
+    "font/woff2",
+    "image/avif",
+    "image/gif",
+    "image/jpeg",
+    "image/png",
+    "image/webp",
+    "video/*",
+)
+
+# Blocos a partir deste tamanho são comprimidos em uma thread, fora do event loop
+THREAD_MINIMUM_SIZE = 128 * 1024
+
+# Extensões que valem a pena pré-comprimir
+COMPRESSIBLE_EXTENSIONS = (".html", ".js", ".css", ".json", ".svg", ".xml", ".txt", ".map")
+
+# Ordem de preferência quando o cliente aceita mais de uma codificação
+_SIBLINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Codificações de `Accept-Encoding` com o respectivo q (q=0 significa recusada)."""
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def _accepts(accepted: Dict[str, float], encoding: str) -> bool:
+    return accepted.get(encoding, accepted.get("*", 0.0)) > 0
+
+
+class _GzipEncoder:
+    content_encoding = "gzip"
+
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        # Em streaming cada bloco é enviado ao cliente assim que produzido
+        return self._compressor.compress(body) + self._compressor.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    content_encoding = "br"
+
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        data = self._compressor.process(body)
+        return data + (self._compressor.flush() if more_body else self._compressor.finish())
+
+
+def _is_excluded(media_type: str, excluded: Tuple[str, ...]) -> bool:
+    media_type = media_type.partition(";")[0].strip().lower()
+    return media_type in excluded or media_type.partition("/")[0] + "/*" in excluded
+
+
+class _CompressionResponder:
+    """
+    Aplica o `encoder` a uma resposta (None = sem compressão, só o `Vary`).
+    O início da resposta é retido até o primeiro bloco do corpo: respostas
+    pequenas, parciais (206), já codificadas ou de tipos excluídos saem como
+    vieram; as demais ganham `Content-Encoding` (e `Content-Length` recalculado,
+    ou removido em streaming).
+    """
+
+    def __init__(self, app: ASGIApp, encoder, minimum_size: int, exclude_content_types: Tuple[str, ...]) -> None:
+        self.app = app
+        self.encoder = encoder
+        self.minimum_size = minimum_size
+        self.exclude_content_types = exclude_content_types
+        self.send: Optional[Send] = None
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.started = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def _encode(self, body: bytes, more_body: bool) -> bytes:
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            return await asyncio.to_thread(self.encoder.compress, body, more_body)
+        return self.encoder.compress(body, more_body)
+
+    async def send_with_compression(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.start_message = message
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] == 206
+                or _is_excluded(headers.get("content-type", ""), self.exclude_content_types)
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+        if self.passthrough or message_type != "http.response.body":
+            if not self.passthrough and not self.started and message_type == "http.response.pathsend":
+                await self.send(self.start_message)
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.started:
+            # Demais blocos de uma resposta em streaming
+            if self.encoder is not None:
+                message["body"] = await self._encode(body, more_body)
+            await self.send(message)
+            return
+
+        self.started = True
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        if len(body) < self.minimum_size and not more_body:
+            await self.send(self.start_message)
+            await self.send(message)
+            return
+        headers.add_vary_header("Accept-Encoding")
+        if self.encoder is not None:
+            message["body"] = await self._encode(body, more_body)
+            headers["Content-Encoding"] = self.encoder.content_encoding
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(message["body"]))
+        await self.send(self.start_message)
+        await self.send(message)
+
+
+class CompressionMiddleware:
+    """
+    Comprime respostas maiores que `minimum_size` com brotli ou gzip, conforme
+    o `Accept-Encoding` do cliente (brotli preferido quando disponível).
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        exclude_content_types: Tuple[str, ...] = EXCLUDED_CONTENT_TYPES,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.exclude_content_types = exclude_content_types
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and _accepts(accepted, "br"):
+            encoder = _BrotliEncoder(self.brotli_quality)
+        elif _accepts(accepted, "gzip"):
+            encoder = _GzipEncoder(self.gzip_level)
+        else:
+            encoder = None
+        responder = _CompressionResponder(self.app, encoder, self.minimum_size, self.exclude_content_types)
+        await responder(scope, receive, send)
+
+
+def precompress_file(path: str, min_size: int = 1024) -> List[str]:
+    """
+    Grava `path.gz` (e `path.br`, se brotli estiver instalado) ao lado do
+    arquivo. Irmãos mais novos que o original são mantidos. Retorna os
+    caminhos gravados.
+    """
+    source = os.stat(path)
+    if source.st_size < min_size:
+        return []
+
+    written = []
+    for encoding, suffix in _SIBLINGS:
+        if encoding == "br" and brotli is None:
+            continue
+        target = path + suffix
+        try:
+            if os.stat(target).st_mtime >= source.st_mtime:
+                continue
+        except FileNotFoundError:
+            pass
+
+        tmp_path = f"{target}.tmp"
+        if encoding == "gzip":
+            with open(path, "rb") as src, gzip.GzipFile(tmp_path, "wb", compresslevel=9, mtime=0) as dst:
+                shutil.copyfileobj(src, dst)
+        else:
+            with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+                dst.write(brotli.compress(src.read(), quality=11))
+        os.replace(tmp_path, target)
+        written.append(target)
+    return written
+
+
+def precompress_tree(
+    root: str,
+    extensions: Iterable[str] = COMPRESSIBLE_EXTENSIONS,
+    min_size: int = 1024,
+) -> List[str]:
+    """Pré-comprime os arquivos de `root` (recursivo) com as extensões dadas."""
+    extensions = tuple(extensions)
+    written = []
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if name.endswith(extensions):
+                written.extend(precompress_file(os.path.join(directory, name), min_size))
+    return written
+
+
+# Cabeçalhos mantidos em uma resposta 304 (RFC 9110, 15.4.5)
+_NOT_MODIFIED_HEADERS = ("cache-control", "content-location", "date", "etag", "expires", "vary")
+
+
+def _not_modified(headers: Headers) -> Response:
+    return Response(
+        status_code=304,
+        headers={name: value for name, value in headers.items() if name in _NOT_MODIFIED_HEADERS},
+    )
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    `StaticFiles` que entrega `arquivo.br`/`arquivo.gz` quando existem, não
+    são mais antigos que o original e o cliente aceita a codificação.
+    Caminhos que começam com um dos `immutable_prefixes` (arquivos com hash
+    no nome, como `assets/` do Vite) recebem cache de um ano, imutável.
+    """
+
+    def __init__(self, *args, immutable_prefixes: Tuple[str, ...] = (), **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.immutable_prefixes = immutable_prefixes
+
+    def _sibling(self, full_path: str, source: os.stat_result, scope: Scope) -> Optional[Tuple[str, str, os.stat_result]]:
+        headers = Headers(scope=scope)
+        if "range" in headers:
+            # Intervalos são sempre do arquivo original
+            return None
+        accepted = accepted_encodings(headers.get("accept-encoding", ""))
+        for encoding, suffix in _SIBLINGS:
+            if not _accepts(accepted, encoding):
+                continue
+            try:
+                stat_result = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            if stat_result.st_mtime >= source.st_mtime:
+                return full_path + suffix, encoding, stat_result
+        return None
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        full_path = os.fspath(full_path)
+        sibling = self._sibling(full_path, stat_result, scope)
+        if sibling is None:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+        else:
+            path, encoding, sibling_stat = sibling
+            response = FileResponse(
+                path,
+                status_code=status_code,
+                stat_result=sibling_stat,
+                media_type=guess_type(full_path)[0] or "application/octet-stream",
+                headers={"Content-Encoding": encoding},
+            )
+            if self.is_not_modified(response.headers, Headers(scope=scope)):
+                response = _not_modified(response.headers)
+        response.headers.setdefault("Vary", "Accept-Encoding")
+
+        relative = os.path.relpath(full_path, self.directory).replace(os.sep, "/") if self.directory else ""
+        if self.immutable_prefixes and relative.startswith(self.immutable_prefixes):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
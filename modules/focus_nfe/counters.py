@@ -0,0 +1,123 @@
+"""
+Contadores de notas por (dia de criação, tipo, status), mantidos na mesma
+transação que cria a nota ou muda o seu status. As estatísticas do dashboard
+somam esses buckets em vez de agrupar a tabela `invoices` inteira.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import Invoice, InvoiceCounter
+
+COUNTERS_TABLE = InvoiceCounter.__tablename__
+
+Bucket = Tuple[date, str, str]
+
+
+def _bucket(invoice: Invoice, status: Optional[str]) -> Bucket:
+    created_at = invoice.created_at or datetime.utcnow()
+    return created_at.date(), invoice.type or "", status or ""
+
+
+def apply_deltas(db: Session, deltas: Dict[Bucket, int]) -> None:
+    """
+    Soma `deltas` aos contadores com um upsert do dialeto (sem commit; roda
+    na transação do chamador).
+    """
+    rows = [
+        {"day": day, "type": doc_type, "status": status, "count": delta}
+        for (day, doc_type, status), delta in deltas.items()
+        if delta
+    ]
+    if not rows:
+        return
+
+    table = InvoiceCounter.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["day", "type", "status"],
+            set_={"count": table.c.count + stmt.excluded.count},
+        )
+        db.execute(stmt)
+    elif dialect in ("mysql", "mariadb"):
+        stmt = mysql.insert(table).values(rows)
+        db.execute(stmt.on_duplicate_key_update(count=table.c.count + stmt.inserted.count))
+    else:
+        for row in rows:
+            counter = db.get(InvoiceCounter, (row["day"], row["type"], row["status"]))
+            if counter is None:
+                db.add(InvoiceCounter(**row))
+            else:
+                counter.count += row["count"]
+        db.flush()
+
+
+def record_created(db: Session, invoices: Iterable[Invoice]) -> None:
+    """Conta notas recém-criadas (chamar após o flush, com `created_at` preenchido)."""
+    deltas: Dict[Bucket, int] = defaultdict(int)
+    for invoice in invoices:
+        deltas[_bucket(invoice, invoice.status)] += 1
+    apply_deltas(db, deltas)
+
+
+def record_status_change(db: Session, invoice: Invoice, previous: Optional[str], status: Optional[str]) -> None:
+    """Move a nota do bucket do status anterior para o do novo status."""
+    if previous == status:
+        return
+    apply_deltas(db, {_bucket(invoice, previous): -1, _bucket(invoice, status): 1})
+
+
+def record_status_changes(db: Session, changes: Iterable[Tuple[Invoice, Optional[str], Optional[str]]]) -> None:
+    """Como `record_status_change`, para várias notas (`(nota, anterior, novo)`) em um único upsert."""
+    deltas: Dict[Bucket, int] = defaultdict(int)
+    for invoice, previous, status in changes:
+        if previous != status:
+            deltas[_bucket(invoice, previous)] -= 1
+            deltas[_bucket(invoice, status)] += 1
+    apply_deltas(db, deltas)
+
+
+def read_stats(
+    db: Session,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    doc_type: Optional[str] = None,
+) -> Dict[str, int]:
+    """Total de notas por status, criadas entre `date_from` e `date_to` (inclusive)."""
+    query = db.query(InvoiceCounter.status, func.sum(InvoiceCounter.count))
+    if date_from:
+        query = query.filter(InvoiceCounter.day >= date_from)
+    if date_to:
+        query = query.filter(InvoiceCounter.day <= date_to)
+    if doc_type:
+        query = query.filter(InvoiceCounter.type == doc_type)
+    return {status: int(total) for status, total in query.group_by(InvoiceCounter.status) if total}
+
+
+def rebuild_counters(db: Session, batch_size: int = 10_000) -> int:
+    """
+    Recalcula todos os contadores a partir da tabela `invoices` (correção de
+    divergências). Retorna o número de notas contadas.
+    """
+    deltas: Dict[Bucket, int] = defaultdict(int)
+    total = 0
+    rows = db.query(Invoice.created_at, Invoice.type, Invoice.status).yield_per(batch_size)
+    for created_at, doc_type, status in rows:
+        deltas[((created_at or datetime.utcnow()).date(), doc_type or "", status or "")] += 1
+        total += 1
+
+    db.query(InvoiceCounter).delete(synchronize_session=False)
+    db.add_all(
+        InvoiceCounter(day=day, type=doc_type, status=status, count=count)
+        for (day, doc_type, status), count in deltas.items()
+    )
+    db.commit()
+    return total
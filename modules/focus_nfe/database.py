@@ -1,5 +1,6 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
+from datetime import datetime
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./contabil_ia.db")
@@ -16,4 +17,67 @@ def get_db():
 
 def init_db():
     from .models import Base
+    from .counters import COUNTERS_TABLE, rebuild_counters
+    new_counters = not inspect(engine).has_table(COUNTERS_TABLE)
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        migrate_missing(conn, Base.metadata)
+    if new_counters:
+        # Banco anterior aos contadores: preenche a partir das notas existentes
+        with SessionLocal() as db:
+            rebuild_counters(db)
+
+def migrate_missing(conn, metadata):
+    """
+    Migração leve para bancos já existentes: `create_all` só cria tabelas
+    novas, então colunas e índices adicionados aos models depois são criados
+    aqui. Colunas novas entram como anuláveis (sem default no banco) e
+    restrições de unicidade devem ser declaradas como índice (`index=True`).
+    """
+    inspector = inspect(conn)
+    quote = conn.dialect.identifier_preparer.quote
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"))
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+class DatabaseCacheStore:
+    """Persistência de um `TTLCache` na tabela `cache_entries`, separada por namespace."""
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+
+    def load(self, key):
+        from .models import CacheEntry
+        with SessionLocal() as db:
+            entry = db.get(CacheEntry, (self.namespace, key))
+            if entry is None:
+                return None
+            return entry.data, entry.stored_at.timestamp()
+
+    def save(self, key, value, stored_at):
+        from .models import CacheEntry
+        with SessionLocal() as db:
+            db.merge(CacheEntry(
+                namespace=self.namespace,
+                key=key,
+                data=value,
+                stored_at=datetime.fromtimestamp(stored_at)
+            ))
+            db.commit()
+
+    def delete(self, key=None):
+        from .models import CacheEntry
+        with SessionLocal() as db:
+            query = db.query(CacheEntry).filter(CacheEntry.namespace == self.namespace)
+            if key is not None:
+                query = query.filter(CacheEntry.key == key)
+            query.delete(synchronize_session=False)
+            db.commit()
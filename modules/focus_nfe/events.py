@@ -0,0 +1,119 @@
+"""
+Pub/sub em processo para mudanças de status das notas.
+
+Os pontos que alteram o status (emissão, webhook, consulta, cancelamento)
+publicam um evento após o commit. Cada conexão SSE do dashboard é um assinante
+com fila própria e filtros opcionais por tipo e tenant (CNPJ do emitente).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import os
+import threading
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
+
+from .models import Invoice
+
+
+def invoice_tenant(invoice: Invoice) -> Optional[str]:
+    """CNPJ do emitente da nota, usado como tenant nos filtros."""
+    if invoice.cnpj_emitente:
+        return invoice.cnpj_emitente
+    payload = invoice.payload or {}
+    emitter = payload.get("prestador") or payload.get("emitente") or {}
+    return payload.get("cnpj_emitente") or emitter.get("cnpj")
+
+
+def status_event(invoice: Invoice, previous_status: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "ref": invoice.referencia,
+        "type": invoice.type,
+        "status": invoice.status,
+        "previous_status": previous_status,
+        "tenant": invoice_tenant(invoice),
+        "at": datetime.utcnow().isoformat(),
+    }
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int, doc_type: Optional[str], tenant: Optional[str]):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.doc_type = doc_type
+        self.tenant = tenant
+        self.dropped = 0
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if self.doc_type and event.get("type") != self.doc_type:
+            return False
+        if self.tenant and event.get("tenant") != self.tenant:
+            return False
+        return True
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        # Assinante lento: descarta o evento mais antigo em vez de bloquear quem publica
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class StatusBroker:
+    """
+    Fan-out de eventos para os assinantes do processo. `publish` não bloqueia
+    e pode ser chamado de qualquer thread; a entrega acontece no event loop de
+    cada assinante.
+    """
+
+    def __init__(self, queue_size: int = 256) -> None:
+        self.queue_size = queue_size
+        self._subscribers: set = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, doc_type: Optional[str] = None, tenant: Optional[str] = None) -> Subscription:
+        subscription = Subscription(asyncio.get_running_loop(), self.queue_size, doc_type, tenant)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        event = {"id": next(self._ids), **event}
+        with self._lock:
+            subscribers = [s for s in self._subscribers if s.matches(event)]
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:  # loop já encerrado
+                self.unsubscribe(subscription)
+
+    async def listen(
+        self,
+        doc_type: Optional[str] = None,
+        tenant: Optional[str] = None,
+        heartbeat: float = 15.0,
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Itera os eventos do assinante; produz None a cada `heartbeat` segundos sem eventos."""
+        subscription = self.subscribe(doc_type, tenant)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscription.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"subscribers": len(self._subscribers)}
+
+
+status_broker = StatusBroker(int(os.environ.get("FOCUS_NFE_EVENTS_QUEUE_SIZE") or 256))
@@ -0,0 +1,191 @@
+"""
+Exportação em massa das notas locais (CSV, JSONL ou Parquet) em streaming.
+
+As linhas são lidas com um cursor do lado do servidor (`yield_per`) em uma
+sessão própria, aberta e fechada pelo gerador, e cada lote é serializado e
+entregue antes da leitura do próximo: a memória usada não depende do
+tamanho do período exportado.
+"""
+
+import csv
+import io
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import select
+
+from .database import SessionLocal
+from .focus_client import json_dumps
+from .models import Invoice
+
+try:  # Parquet é opcional
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - depende do ambiente
+    pyarrow = None
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+EXPORT_COLUMNS = (
+    Invoice.id,
+    Invoice.referencia,
+    Invoice.external_id,
+    Invoice.type,
+    Invoice.status,
+    Invoice.cnpj_emitente,
+    Invoice.documento_destinatario,
+    Invoice.chave,
+    Invoice.numero,
+    Invoice.serie,
+    Invoice.valor_total,
+    Invoice.data_emissao,
+    Invoice.created_at,
+    Invoice.updated_at,
+)
+
+XML_COLUMN = Invoice.xml_url.label("xml_path")
+
+
+def parquet_available() -> bool:
+    return pyarrow is not None
+
+
+def export_query(
+    doc_type: Optional[str] = None,
+    status: Optional[str] = None,
+    cnpj_emitente: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    emitted_from: Optional[datetime] = None,
+    emitted_to: Optional[datetime] = None,
+    include_xml: bool = False,
+):
+    """Consulta da exportação, em ordem de `id` (intervalos de data: início inclusive, fim exclusive)."""
+    columns = EXPORT_COLUMNS + ((XML_COLUMN,) if include_xml else ())
+    stmt = select(*columns)
+    if doc_type:
+        stmt = stmt.where(Invoice.type == doc_type)
+    if status:
+        stmt = stmt.where(Invoice.status == status)
+    if cnpj_emitente:
+        stmt = stmt.where(Invoice.cnpj_emitente == cnpj_emitente)
+    if created_from:
+        stmt = stmt.where(Invoice.created_at >= created_from)
+    if created_to:
+        stmt = stmt.where(Invoice.created_at < created_to)
+    if emitted_from:
+        stmt = stmt.where(Invoice.data_emissao >= emitted_from)
+    if emitted_to:
+        stmt = stmt.where(Invoice.data_emissao < emitted_to)
+    return stmt.order_by(Invoice.id)
+
+
+def _iter_batches(stmt, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Lotes de linhas (dicts) lidos com cursor do servidor, em uma sessão própria."""
+    with SessionLocal() as db:
+        result = db.execute(stmt.execution_options(stream_results=True, yield_per=batch_size))
+        for partition in result.mappings().partitions():
+            yield [dict(row) for row in partition]
+
+
+def _text(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _csv_chunks(stmt, names: List[str], batch_size: int) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for batch in _iter_batches(stmt, batch_size):
+        writer.writerows([_text(row[name]) for name in names] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    return _text(value)
+
+
+def _jsonl_chunks(stmt, names: List[str], batch_size: int) -> Iterator[bytes]:
+    for batch in _iter_batches(stmt, batch_size):
+        yield b"".join(
+            json_dumps({name: _json_value(row[name]) for name in names}) + b"\n"
+            for row in batch
+        )
+
+
+class _ChunkSink(io.RawIOBase):
+    """Arquivo só de escrita que acumula os bytes até serem retirados com `drain`."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_schema(names: List[str]):
+    types = {
+        "id": pyarrow.int64(),
+        "valor_total": pyarrow.decimal128(15, 2),
+        "data_emissao": pyarrow.timestamp("us"),
+        "created_at": pyarrow.timestamp("us"),
+        "updated_at": pyarrow.timestamp("us"),
+    }
+    return pyarrow.schema([(name, types.get(name, pyarrow.string())) for name in names])
+
+
+def _parquet_chunks(stmt, names: List[str], batch_size: int) -> Iterator[bytes]:
+    """Um row group por lote; os bytes de cada row group são entregues assim que escritos."""
+    schema = _parquet_schema(names)
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for batch in _iter_batches(stmt, batch_size):
+            columns = {name: [row[name] for row in batch] for name in names}
+            writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def stream_export(stmt, export_format: str, batch_size: int = 1_000) -> Iterator[bytes]:
+    """Gera o arquivo de exportação em blocos de bytes, um (ou mais) por lote de linhas."""
+    names = [column.name for column in stmt.selected_columns]
+    if export_format == "csv":
+        return _csv_chunks(stmt, names, batch_size)
+    if export_format == "jsonl":
+        return _jsonl_chunks(stmt, names, batch_size)
+    if export_format == "parquet":
+        return _parquet_chunks(stmt, names, batch_size)
+    raise ValueError(f"Formato de exportação desconhecido: {export_format}")
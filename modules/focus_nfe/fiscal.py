@@ -0,0 +1,172 @@
+"""
+Extração dos campos fiscais das notas (emitente, destinatário, chave, número,
+série, valor e data de emissão) a partir do payload enviado e das respostas
+da Focus, para as colunas indexadas de `invoices`.
+
+Aceita tanto o formato dos schemas da API local (ex: `prestador.cnpj`,
+`tomador.cpf`, `items[].valor_total`) quanto os campos nativos da Focus
+(ex: `cnpj_emitente`, `cpf_destinatario`, `valor_total`, `chave_nfe`).
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session, load_only
+
+from .models import Invoice
+
+FISCAL_FIELDS = (
+    "cnpj_emitente",
+    "documento_destinatario",
+    "chave",
+    "numero",
+    "serie",
+    "valor_total",
+    "data_emissao",
+)
+_FISCAL_COLUMNS = tuple(getattr(Invoice, field) for field in FISCAL_FIELDS)
+
+# Onde procurar cada campo, por tipo de documento (a resposta da Focus tem prioridade)
+_EMITTER_PATHS = {
+    "nfse": ("cnpj_prestador", "prestador.cnpj"),
+    "nfe": ("cnpj_emitente", "prestador.cnpj", "emitente.cnpj"),
+    "nfce": ("cnpj_emitente", "prestador.cnpj", "emitente.cnpj"),
+    "cte": ("cnpj_emitente", "emitente.cnpj"),
+    "mdfe": ("cnpj_emitente", "emitente.cnpj"),
+}
+_RECIPIENT_PATHS = {
+    "nfse": ("cnpj_tomador", "cpf_tomador", "tomador.cnpj", "tomador.cpf"),
+    "nfe": ("cnpj_destinatario", "cpf_destinatario", "tomador.cnpj", "tomador.cpf"),
+    "nfce": ("cnpj_destinatario", "cpf_destinatario", "tomador.cnpj", "tomador.cpf"),
+    "cte": ("cnpj_destinatario", "cpf_destinatario", "destinatario.cnpj", "destinatario.cpf"),
+    "mdfe": (),
+}
+_VALUE_PATHS = {
+    "nfse": ("valor_servicos", "servico.valor_servicos"),
+    "nfe": ("valor_total",),
+    "nfce": ("valor_total",),
+    "cte": ("valor_total", "valor_total_servico"),
+    "mdfe": ("valor_total_carga", "valor_total"),
+}
+_KEY_PATHS = ("chave_nfe", "chave_cte", "chave_mdfe", "chave_nfse", "chave_acesso", "chave")
+_NUMBER_PATHS = ("numero", "numero_nfse")
+_SERIES_PATHS = ("serie",)
+_DATE_PATHS = ("data_emissao",)
+
+
+def _get(data: Optional[Dict[str, Any]], path: str) -> Any:
+    value: Any = data
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _first(sources: Iterable[Optional[Dict[str, Any]]], paths: Iterable[str]) -> Any:
+    sources = list(sources)
+    for path in paths:
+        for source in sources:
+            value = _get(source, path)
+            if value not in (None, ""):
+                return value
+    return None
+
+
+def _digits(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    digits = "".join(filter(str.isdigit, str(value)))
+    return digits or None
+
+
+def _str(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _decimal(value: Any) -> Optional[Decimal]:
+    try:
+        return Decimal(str(value)).quantize(Decimal("0.01"))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _datetime(value: Any) -> Optional[datetime]:
+    """Datas da Focus vêm com fuso (ISO 8601); são gravadas em UTC sem fuso, como `created_at`."""
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value))
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _items_total(payload: Optional[Dict[str, Any]]) -> Optional[Decimal]:
+    items = (payload or {}).get("items") or (payload or {}).get("itens")
+    if not isinstance(items, list) or not items:
+        return None
+    values = [_decimal(item.get("valor_total", item.get("valor_bruto"))) for item in items if isinstance(item, dict)]
+    if any(value is None for value in values):
+        return None
+    return sum(values, Decimal("0.00"))
+
+
+def extract_fiscal_fields(
+    doc_type: str,
+    payload: Optional[Dict[str, Any]],
+    response: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Retorna os campos fiscais encontrados (None quando ausentes)."""
+    sources = (response, payload)
+    value = _first(sources, _VALUE_PATHS.get(doc_type, ("valor_total",)))
+    return {
+        "cnpj_emitente": _digits(_first(sources, _EMITTER_PATHS.get(doc_type, ("cnpj_emitente",)))),
+        "documento_destinatario": _digits(_first(sources, _RECIPIENT_PATHS.get(doc_type, ()))),
+        "chave": _digits(_first((response,), _KEY_PATHS)),
+        "numero": _str(_first((response, payload), _NUMBER_PATHS)),
+        "serie": _str(_first((response, payload), _SERIES_PATHS)),
+        "valor_total": _decimal(value) if value is not None else _items_total(payload),
+        "data_emissao": _datetime(_first(sources, _DATE_PATHS)),
+    }
+
+
+def apply_fiscal_fields(invoice: Invoice) -> None:
+    """
+    Atualiza as colunas fiscais da nota a partir do payload e da última
+    resposta gravada. Campos não encontrados não apagam valores já extraídos.
+    """
+    for field, value in extract_fiscal_fields(invoice.type, invoice.payload, invoice.response_data).items():
+        if value is not None:
+            setattr(invoice, field, value)
+
+
+def backfill_fiscal_fields(db: Session, batch_size: int = 1_000, only_missing: bool = True) -> int:
+    """
+    Preenche as colunas fiscais das notas já gravadas, em lotes por `id` com
+    um commit por lote. Com `only_missing`, processa só as notas sem
+    `cnpj_emitente`. Retorna o número de notas processadas.
+    """
+    total = 0
+    last_id = 0
+    while True:
+        query = (
+            db.query(Invoice)
+            .options(load_only(Invoice.id, Invoice.type, Invoice.payload, Invoice.response_data, *_FISCAL_COLUMNS))
+            .filter(Invoice.id > last_id)
+        )
+        if only_missing:
+            query = query.filter(Invoice.cnpj_emitente.is_(None))
+        batch = query.order_by(Invoice.id).limit(batch_size).all()
+        if not batch:
+            return total
+        for invoice in batch:
+            apply_fiscal_fields(invoice)
+        db.commit()
+        total += len(batch)
+        last_id = batch[-1].id
+        db.expunge_all()
@@ -1,16 +1,63 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
 import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from dataclasses import dataclass
-from typing import Any, Dict, List, Mapping, Optional, Union
+from typing import Any, AsyncIterator, Dict, Iterator, List, Mapping, Optional, Tuple, Union
 
 import httpx
 
+try:  # Caminho rápido opcional para (de)serialização JSON
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+from .cache import FRESH, MUNICIPIO_CACHE, STALE
+from .metrics import (
+    FOCUS_DOWNLOAD_BYTES,
+    FOCUS_DOWNLOAD_SECONDS,
+    FOCUS_IN_FLIGHT,
+    FOCUS_RATE_LIMIT_WAIT_SECONDS,
+    FOCUS_REQUEST_SECONDS,
+    FOCUS_REQUESTS,
+    FOCUS_RETRIES,
+    endpoint_labels,
+)
+from .rate_limit import RETRY_STATUS_CODES, backoff_delay, get_token_bucket, retry_after
+from .singleflight import AsyncSingleFlight, SingleFlight
+
 DEFAULT_BASE_URLS = {
     "producao": "https://api.focusnfe.com.br",
     "homologacao": "https://homologacao.focusnfe.com.br",
 }
 
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# GETs idênticos simultâneos compartilham uma única chamada à Focus
+_sync_inflight = SingleFlight()
+_async_inflight = AsyncSingleFlight()
+
+# Referências das tasks de revalidação em segundo plano (evita coleta pelo GC)
+_background_tasks: set = set()
+
+# Mesmos limites padrão do httpx.
+DEFAULT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=5.0)
+
 def _load_dotenv_if_present(path: str = ".env") -> None:
     """
     Loader mínimo de `.env` (sem dependências) para facilitar testes locais.
@@ -38,29 +85,190 @@ def _load_dotenv_if_present(path: str = ".env") -> None:
         return
 
 
-@dataclass
+_NOT_DECODED = object()
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """Decodifica JSON usando `orjson` quando instalado."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any) -> bytes:
+    """Serializa para JSON (bytes UTF-8) usando `orjson` quando instalado."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def resolve_credentials(
+    token: Optional[str] = None,
+    base_url: Optional[str] = None,
+    environment: Optional[str] = None,
+) -> Tuple[str, str]:
+    """
+    Resolve o par (token, base_url) usado pelos clientes.
+    Parâmetros explícitos têm prioridade sobre as variáveis de ambiente.
+    """
+    if token is None and not os.environ.get("FOCUS_NFE_TOKEN"):
+        _load_dotenv_if_present(".env")
+
+    token = token or os.environ.get("FOCUS_NFE_TOKEN")
+    if not token:
+        raise RuntimeError("FOCUS_NFE_TOKEN must be set for Focus requests.")
+    return token, resolve_base_url(base_url, environment)
+
+
+def resolve_base_url(base_url: Optional[str] = None, environment: Optional[str] = None) -> str:
+    """URL base da Focus: explícita, `FOCUS_NFE_BASE_URL` ou a padrão do ambiente."""
+    return (
+        base_url
+        or os.environ.get("FOCUS_NFE_BASE_URL")
+        or DEFAULT_BASE_URLS.get(
+            (environment or os.environ.get("FOCUS_NFE_ENV", "homologacao")).lower(),
+            DEFAULT_BASE_URLS["homologacao"],
+        )
+    )
+
+
+def municipio_cache_key(base_url: str, codigo_ibge: str) -> str:
+    """Chave do `MUNICIPIO_CACHE` (os requisitos dependem do ambiente, não do token)."""
+    return f"{base_url}|{codigo_ibge}"
+
+
 class FocusNFeResponse:
-    status_code: int
-    body: Union[Dict[str, Any], List[Any], str, None]
-    headers: Mapping[str, str]
-    ok: bool
+    """
+    Resposta da Focus. O corpo só é decodificado quando `body` é acessado, e
+    `content` mantém os bytes originais para repassar sem decodificar.
+    """
+
+    def __init__(
+        self,
+        status_code: int,
+        body: Any = _NOT_DECODED,
+        headers: Optional[Mapping[str, str]] = None,
+        ok: bool = True,
+        content: Optional[bytes] = None,
+        encoding: Optional[str] = None,
+    ) -> None:
+        self.status_code = status_code
+        self.headers = headers if headers is not None else {}
+        self.ok = ok
+        self._body = body
+        self._content = content
+        self._encoding = encoding or "utf-8"
+
+    @property
+    def body(self) -> Union[Dict[str, Any], List[Any], str, None]:
+        if self._body is _NOT_DECODED:
+            try:
+                self._body = json_loads(self._content)
+            except ValueError:
+                self._body = self.text
+        return self._body
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            self._content = json_dumps(self._body)
+        return self._content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self._encoding, errors="replace")
+
+    def __repr__(self) -> str:
+        return f"FocusNFeResponse(status_code={self.status_code}, ok={self.ok}, size={len(self.content)})"
 
     @classmethod
     def from_httpx(cls, response: httpx.Response) -> "FocusNFeResponse":
-        try:
-            body = response.json()
-        except ValueError:
-            body = response.text
         return cls(
             status_code=response.status_code,
-            body=body,
             headers=response.headers,
             ok=response.is_success,
+            content=response.content,
+            encoding=response.encoding,
         )
 
+    @classmethod
+    def from_cache(cls, body: Any, state: str) -> "FocusNFeResponse":
+        return cls(
+            status_code=200,
+            body=body,
+            headers={"X-Cache": state, "Content-Type": "application/json"},
+            ok=True,
+        )
 
-class FocusNFeClient:
-    """Cliente base para trabalhar com a API Focus NFe v2."""
+
+@dataclass
+class DownloadResult:
+    """Resultado de um download gravado em disco (`download_document_to`)."""
+
+    status_code: int
+    ok: bool
+    path: Optional[str] = None
+    size: int = 0
+    sha256: Optional[str] = None
+    error: Optional[str] = None
+
+
+class _AtomicFileWriter:
+    """
+    Grava em um arquivo temporário no mesmo diretório do destino, calculando
+    o SHA-256 durante a escrita, e só o renomeia para o destino no `commit`.
+    Leitores nunca veem um arquivo parcial.
+    """
+
+    def __init__(self, dest_path: str) -> None:
+        self.dest_path = dest_path
+        directory = os.path.dirname(os.path.abspath(dest_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(dest_path)}.", suffix=".part", dir=directory)
+        self._file = os.fdopen(fd, "wb")
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+    def commit(self, status_code: int) -> DownloadResult:
+        self._file.close()
+        # mkstemp cria o arquivo como 0600; mantém a permissão usual dos arquivos do storage
+        os.chmod(self.tmp_path, 0o644)
+        os.replace(self.tmp_path, self.dest_path)
+        return DownloadResult(
+            status_code=status_code,
+            ok=True,
+            path=self.dest_path,
+            size=self.size,
+            sha256=self._hash.hexdigest(),
+        )
+
+    def abort(self) -> None:
+        self._file.close()
+        try:
+            os.unlink(self.tmp_path)
+        except OSError:
+            pass
+
+
+class FocusNFeError(RuntimeError):
+    """Erro retornado pela Focus em operações que não devolvem a resposta bruta (ex: iteradores)."""
+
+    def __init__(self, response: FocusNFeResponse) -> None:
+        super().__init__(f"Focus NFe respondeu HTTP {response.status_code}: {response.body}")
+        self.response = response
+
+
+class _FocusNFeBase:
+    """
+    Configuração e helpers compartilhados pelos clientes síncrono e assíncrono.
+    Os helpers apenas montam a chamada e delegam para `_request`; no
+    `AsyncFocusNFeClient` eles retornam awaitables.
+    """
 
     def __init__(
         self,
@@ -68,38 +276,100 @@ class FocusNFeClient:
         base_url: Optional[str] = None,
         environment: Optional[str] = None,
         timeout: float = 30.0,
+        limits: Optional[httpx.Limits] = None,
+        http2: bool = False,
+        max_streams: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        coalesce: Optional[bool] = None,
     ) -> None:
-        if token is None and not os.environ.get("FOCUS_NFE_TOKEN"):
-            _load_dotenv_if_present(".env")
-
-        self.token = token or os.environ.get("FOCUS_NFE_TOKEN")
-        if not self.token:
-            raise RuntimeError("FOCUS_NFE_TOKEN must be set for Focus requests.")
-
-        self.base_url = (
-            base_url
-            or os.environ.get("FOCUS_NFE_BASE_URL")
-            or DEFAULT_BASE_URLS.get(
-                (environment or os.environ.get("FOCUS_NFE_ENV", "homologacao")).lower(),
-                DEFAULT_BASE_URLS["homologacao"],
-            )
-        )
+        self.token, self.base_url = resolve_credentials(token, base_url, environment)
         self.timeout = timeout
+        self.limits = limits or DEFAULT_LIMITS
+        self.http2 = http2
+        self.max_streams = max_streams
+        self.max_retries = max_retries if max_retries is not None else int(os.environ.get("FOCUS_NFE_MAX_RETRIES") or 3)
+        self._bucket = get_token_bucket(self.token)
+        if coalesce is None:
+            coalesce = os.environ.get("FOCUS_NFE_COALESCE_GETS", "true").lower() not in ("0", "false", "nao", "no")
+        self.coalesce = coalesce
+        if http2 and not _h2_available():
+            raise RuntimeError("HTTP/2 requer o pacote h2 (pip install 'httpx[http2]').")
         self._init_client()
 
+    def _max_in_flight(self) -> Optional[int]:
+        """
+        Limite de requisições simultâneas do cliente. Em HTTP/2 é o número de
+        conexões vezes o de streams por conexão; em HTTP/1.1 o próprio pool
+        de conexões já limita.
+        """
+        if not self.http2 or not self.max_streams:
+            return None
+        return (self.limits.max_connections or 1) * self.max_streams
+
     def _init_client(self) -> None:
-        self._client = httpx.Client(
-            base_url=self.base_url,
-            timeout=self.timeout,
-            auth=httpx.BasicAuth(self.token, ""),
-            headers={"Content-Type": "application/json"},
-        )
+        raise NotImplementedError
 
     def set_token(self, token: str) -> None:
         """Atualiza o token de autenticação para as próximas requisições."""
         self.token = token
+        self._bucket = get_token_bucket(token)
         self._client.auth = httpx.BasicAuth(token, "")
 
+    def _coalesce_key(self, method: str, endpoint: str, params: Optional[Dict[str, Any]]) -> Optional[Tuple]:
+        """Chave de coalescência; só GETs são coalescidos."""
+        if not self.coalesce or method != "GET":
+            return None
+        return (self.token, self.base_url, method, endpoint, tuple(sorted((params or {}).items())))
+
+    def _retry_delay(
+        self,
+        attempt: int,
+        retry: bool,
+        response: Optional[httpx.Response] = None,
+    ) -> Optional[float]:
+        """
+        Decide se a tentativa deve ser repetida e após quanto tempo.
+        Sem `response`, a falha foi de transporte (conexão, timeout).
+
+        Um 429 é sempre repetido (a Focus não processou a requisição) e pausa
+        o bucket do token. Erros 5xx e de transporte só são repetidos quando
+        `retry` é verdadeiro: GETs e `create_document`, cujo `ref` já funciona
+        como chave de idempotência.
+        """
+        if attempt >= self.max_retries:
+            return None
+        if response is not None and response.status_code == 429:
+            wait = retry_after(response.headers)
+            delay = (wait if wait is not None else backoff_delay(attempt)) + backoff_delay(0, base=0.25)
+            self._bucket.pause(delay)
+            return delay
+        if not retry:
+            return None
+        if response is None or response.status_code in RETRY_STATUS_CODES:
+            return backoff_delay(attempt)
+        return None
+
+    @staticmethod
+    def _record_attempt(method: str, labels: Tuple[str, str], started: float, status: Union[int, str]) -> None:
+        endpoint, doc_type = labels
+        FOCUS_REQUEST_SECONDS.observe(time.perf_counter() - started, method=method, endpoint=endpoint, doc_type=doc_type)
+        FOCUS_REQUESTS.inc(method=method, endpoint=endpoint, doc_type=doc_type, status=status)
+
+    @staticmethod
+    def _record_retry(method: str, labels: Tuple[str, str], response: Optional[httpx.Response]) -> None:
+        if response is None:
+            reason = "transport"
+        else:
+            reason = "429" if response.status_code == 429 else "5xx"
+        endpoint, doc_type = labels
+        FOCUS_RETRIES.inc(method=method, endpoint=endpoint, doc_type=doc_type, reason=reason)
+
+    @staticmethod
+    def _record_download(doc_type: str, ext: str, started: float, ok: bool, size: int) -> None:
+        FOCUS_DOWNLOAD_SECONDS.observe(time.perf_counter() - started, doc_type=doc_type, ext=ext)
+        if ok:
+            FOCUS_DOWNLOAD_BYTES.inc(size, doc_type=doc_type, ext=ext)
+
     def _request(
         self,
         method: str,
@@ -107,21 +377,16 @@ class FocusNFeClient:
         *,
         params: Optional[Dict[str, Any]] = None,
         json: Optional[Dict[str, Any]] = None,
+        retry: Optional[bool] = None,
     ) -> FocusNFeResponse:
-        response = self._client.request(
-            method,
-            endpoint,
-            params=params,
-            json=json,
-        )
-        return FocusNFeResponse.from_httpx(response)
+        raise NotImplementedError
 
     # ----------------------
     # Helpers genéricos (v2)
     # ----------------------
     def create_document(self, doc_type: str, referencia: str, payload: Dict[str, Any]) -> FocusNFeResponse:
         params = {"ref": referencia}
-        return self._request("POST", f"/v2/{doc_type}", params=params, json=payload)
+        return self._request("POST", f"/v2/{doc_type}", params=params, json=payload, retry=True)
 
     def get_document(self, doc_type: str, referencia: str, *, completa: Optional[int] = None) -> FocusNFeResponse:
         params: Dict[str, Any] = {}
@@ -129,16 +394,15 @@ class FocusNFeClient:
             params["completa"] = completa
         return self._request("GET", f"/v2/{doc_type}/{referencia}", params=params or None)
 
-    def download_document(self, doc_type: str, referencia: str, ext: str) -> httpx.Response:
-        ext = ext.lstrip(".").lower()
-        return self._client.request("GET", f"/v2/{doc_type}/{referencia}.{ext}")
-
     # ----------------------
     # NFSe (conveniências)
     # ----------------------
-    def consultar_municipio(self, codigo_ibge: str) -> FocusNFeResponse:
-        """Retorna os requisitos do município para emissão de NFSe."""
-        return self._request("GET", f"/v2/municipios/{codigo_ibge}")
+    def _municipio_cache_key(self, codigo_ibge: str) -> str:
+        return municipio_cache_key(self.base_url, codigo_ibge)
+
+    def invalidar_cache_municipio(self, codigo_ibge: Optional[str] = None) -> None:
+        """Descarta os requisitos em cache de um município (ou de todos)."""
+        MUNICIPIO_CACHE.invalidate(self._municipio_cache_key(codigo_ibge) if codigo_ibge else None)
 
     def emitir_nfse(self, referencia: str, dados_nota: Dict[str, Any]) -> FocusNFeResponse:
         """Envia a NFSe para a fila da Focus com o ref definido."""
@@ -205,12 +469,78 @@ class FocusNFeClient:
         status: Optional[str] = None,
     ) -> FocusNFeResponse:
         """Lista as NFSe emitidas com filtros de busca."""
+        params = self._nfse_filters(cnpj_prestador, data_inicial, data_final, status)
+        return self.list_documents("nfse", params=params)
+
+    @staticmethod
+    def _nfse_filters(
+        cnpj_prestador: Optional[str],
+        data_inicial: Optional[str],
+        data_final: Optional[str],
+        status: Optional[str],
+    ) -> Dict[str, Any]:
         params = {}
         if cnpj_prestador: params["cnpj_prestador"] = cnpj_prestador
         if data_inicial: params["data_inicial"] = data_inicial
         if data_final: params["data_final"] = data_final
         if status: params["status"] = status
-        return self.list_documents("nfse", params=params)
+        return params
+
+    # ----------------------
+    # Paginação automática
+    # ----------------------
+    # Os iter_* percorrem todas as páginas e entregam os itens um a um, buscando
+    # a página N+1 enquanto o chamador processa a página N. No cliente síncrono
+    # são generators; no assíncrono, async generators (`async for`).
+    PAGE_PARAM = "pagina"
+    PAGE_SIZE_PARAM = "limite"
+
+    def _page_params(self, params: Optional[Dict[str, Any]], page: int, page_size: Optional[int]) -> Dict[str, Any]:
+        page_params = {**(params or {}), self.PAGE_PARAM: page}
+        if page_size:
+            page_params[self.PAGE_SIZE_PARAM] = page_size
+        return page_params
+
+    def _page_items(self, response: FocusNFeResponse, page_size: Optional[int], seen: int) -> Tuple[List[Any], bool]:
+        """Extrai os itens da página e indica se ela é a última."""
+        if not response.ok:
+            raise FocusNFeError(response)
+        items = response.body if isinstance(response.body, list) else []
+        total = response.headers.get("X-Total-Count")
+        last = (
+            not items
+            or (page_size is not None and len(items) < page_size)
+            or (total is not None and total.isdigit() and seen + len(items) >= int(total))
+        )
+        return items, last
+
+    def iter_documents(self, doc_type: str, params: Optional[Dict[str, Any]] = None, *, page_size: Optional[int] = None):
+        """Itera sobre todos os documentos de um tipo, página a página."""
+        return self._iter_items(f"/v2/{doc_type}", params, page_size)
+
+    def iter_nfse(
+        self,
+        cnpj_prestador: Optional[str] = None,
+        data_inicial: Optional[str] = None,
+        data_final: Optional[str] = None,
+        status: Optional[str] = None,
+        *,
+        page_size: Optional[int] = None,
+    ):
+        """Versão paginada de `listar_nfse`."""
+        params = self._nfse_filters(cnpj_prestador, data_inicial, data_final, status)
+        return self.iter_documents("nfse", params, page_size=page_size)
+
+    def iter_nfe_recebidas(self, cnpj: str, *, page_size: Optional[int] = None, **kwargs):
+        """Versão paginada de `consultar_nfe_recebidas`."""
+        return self._iter_items("/v2/nfe_recebidas", {"cnpj": cnpj, **kwargs}, page_size)
+
+    def iter_nfses_recebidas(self, cnpj: str, *, page_size: Optional[int] = None):
+        """Versão paginada de `consultar_nfses_recebidas`."""
+        return self._iter_items("/v2/nfses_recebidas", {"cnpj": cnpj}, page_size)
+
+    def _iter_items(self, endpoint: str, params: Optional[Dict[str, Any]], page_size: Optional[int]):
+        raise NotImplementedError
 
     # ----------------------
     # NFe (Produtos)
@@ -294,6 +624,175 @@ class FocusNFeClient:
         payload = {"fechamento_municipio": codigo_municipio}
         return self._request("POST", f"/v2/mdfe/{referencia}/encerrar", json=payload)
 
+
+class FocusNFeClient(_FocusNFeBase):
+    """Cliente base para trabalhar com a API Focus NFe v2."""
+
+    def _fetch_page(self, endpoint: str, params: Optional[Dict[str, Any]], page: int, page_size: Optional[int]) -> FocusNFeResponse:
+        return self._request("GET", endpoint, params=self._page_params(params, page, page_size))
+
+    def _iter_items(self, endpoint: str, params: Optional[Dict[str, Any]], page_size: Optional[int]) -> Iterator[Any]:
+        seen = 0
+        page = 1
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self._fetch_page, endpoint, params, page, page_size)
+            while True:
+                items, last = self._page_items(future.result(), page_size, seen)
+                if not last:
+                    page += 1
+                    future = executor.submit(self._fetch_page, endpoint, params, page, page_size)
+                yield from items
+                if last:
+                    return
+                seen += len(items)
+
+    def _init_client(self) -> None:
+        self._client = httpx.Client(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=self.http2,
+            auth=httpx.BasicAuth(self.token, ""),
+            headers={"Content-Type": "application/json"},
+        )
+        max_in_flight = self._max_in_flight()
+        self._streams = threading.BoundedSemaphore(max_in_flight) if max_in_flight else nullcontext()
+
+    def _send(
+        self,
+        method: str,
+        endpoint: str,
+        *,
+        retry: Optional[bool] = None,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Envia a requisição respeitando o rate limit do token, com retentativas.
+        Com `stream=True` o corpo não é lido; o chamador deve fechar a resposta.
+        """
+        retry = method == "GET" if retry is None else retry
+        labels = endpoint_labels(endpoint)
+        attempt = 0
+        while True:
+            wait = self._bucket.reserve()
+            if wait > 0:
+                FOCUS_RATE_LIMIT_WAIT_SECONDS.inc(wait)
+                time.sleep(wait)
+            started = time.perf_counter()
+            try:
+                with self._streams:
+                    FOCUS_IN_FLIGHT.inc()
+                    try:
+                        request = self._client.build_request(method, endpoint, **kwargs)
+                        response = self._client.send(request, stream=stream)
+                    finally:
+                        FOCUS_IN_FLIGHT.dec()
+            except httpx.TransportError as e:
+                self._record_attempt(method, labels, started, type(e).__name__)
+                delay = self._retry_delay(attempt, retry)
+                if delay is None:
+                    raise
+                self._record_retry(method, labels, None)
+            else:
+                self._record_attempt(method, labels, started, response.status_code)
+                self._bucket.update_from_headers(response.headers)
+                delay = self._retry_delay(attempt, retry, response)
+                if delay is None:
+                    return response
+                self._record_retry(method, labels, response)
+                response.close()
+            attempt += 1
+            time.sleep(delay)
+
+    def _request(
+        self,
+        method: str,
+        endpoint: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Dict[str, Any]] = None,
+        retry: Optional[bool] = None,
+    ) -> FocusNFeResponse:
+        def call() -> FocusNFeResponse:
+            response = self._send(
+                method,
+                endpoint,
+                retry=retry,
+                params=params,
+                content=json_dumps(json) if json is not None else None,
+            )
+            return FocusNFeResponse.from_httpx(response)
+
+        key = self._coalesce_key(method, endpoint, params)
+        if key is None:
+            return call()
+        return _sync_inflight.do(key, call)
+
+    def download_document(self, doc_type: str, referencia: str, ext: str) -> httpx.Response:
+        ext = ext.lstrip(".").lower()
+        started = time.perf_counter()
+        response = self._send("GET", f"/v2/{doc_type}/{referencia}.{ext}")
+        self._record_download(doc_type, ext, started, response.is_success, len(response.content))
+        return response
+
+    def consultar_municipio(self, codigo_ibge: str) -> FocusNFeResponse:
+        """
+        Retorna os requisitos do município para emissão de NFSe.
+        Usa o `MUNICIPIO_CACHE`; uma entrada vencida (stale) é revalidada na
+        hora e ainda é servida se a Focus estiver indisponível.
+        """
+        key = self._municipio_cache_key(codigo_ibge)
+        body, state = MUNICIPIO_CACHE.get(key)
+        if state == FRESH:
+            return FocusNFeResponse.from_cache(body, state)
+        try:
+            response = self._request("GET", f"/v2/municipios/{codigo_ibge}")
+        except httpx.HTTPError:
+            if state == STALE:
+                return FocusNFeResponse.from_cache(body, state)
+            raise
+        if response.ok:
+            MUNICIPIO_CACHE.set(key, response.body)
+        elif state == STALE and response.status_code >= 500:
+            return FocusNFeResponse.from_cache(body, state)
+        return response
+
+    def download_document_to(
+        self,
+        doc_type: str,
+        referencia: str,
+        ext: str,
+        dest_path: str,
+        *,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    ) -> DownloadResult:
+        """
+        Baixa o PDF/XML em blocos direto para `dest_path`, sem manter o arquivo
+        inteiro em memória. A escrita é atômica e o SHA-256 é calculado durante
+        o download. Em caso de erro HTTP nada é gravado.
+        """
+        ext = ext.lstrip(".").lower()
+        started = time.perf_counter()
+        response = self._send("GET", f"/v2/{doc_type}/{referencia}.{ext}", stream=True)
+        try:
+            if not response.is_success:
+                response.read()
+                result = DownloadResult(status_code=response.status_code, ok=False, error=response.text)
+            else:
+                writer = _AtomicFileWriter(dest_path)
+                try:
+                    for chunk in response.iter_bytes(chunk_size):
+                        writer.write(chunk)
+                except BaseException:
+                    writer.abort()
+                    raise
+                result = writer.commit(response.status_code)
+        finally:
+            response.close()
+        self._record_download(doc_type, ext, started, result.ok, result.size)
+        return result
+
     def close(self) -> None:
         self._client.close()
 
@@ -303,3 +802,197 @@ class FocusNFeClient:
     def __exit__(self, exc_type, exc, tb) -> None:
         self.close()
 
+
+class AsyncFocusNFeClient(_FocusNFeBase):
+    """
+    Versão assíncrona do cliente, baseada em `httpx.AsyncClient`.
+    Possui os mesmos helpers do `FocusNFeClient`, que devem ser aguardados
+    com `await` (ex: `await client.emitir_nfe(ref, dados)`).
+    """
+
+    def _init_client(self) -> None:
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=self.http2,
+            auth=httpx.BasicAuth(self.token, ""),
+            headers={"Content-Type": "application/json"},
+        )
+        max_in_flight = self._max_in_flight()
+        self._streams = asyncio.Semaphore(max_in_flight) if max_in_flight else nullcontext()
+
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        *,
+        retry: Optional[bool] = None,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Envia a requisição respeitando o rate limit do token, com retentativas.
+        Com `stream=True` o corpo não é lido; o chamador deve fechar a resposta.
+        """
+        retry = method == "GET" if retry is None else retry
+        labels = endpoint_labels(endpoint)
+        attempt = 0
+        while True:
+            wait = self._bucket.reserve()
+            if wait > 0:
+                FOCUS_RATE_LIMIT_WAIT_SECONDS.inc(wait)
+                await asyncio.sleep(wait)
+            started = time.perf_counter()
+            try:
+                async with self._streams:
+                    FOCUS_IN_FLIGHT.inc()
+                    try:
+                        request = self._client.build_request(method, endpoint, **kwargs)
+                        response = await self._client.send(request, stream=stream)
+                    finally:
+                        FOCUS_IN_FLIGHT.dec()
+            except httpx.TransportError as e:
+                self._record_attempt(method, labels, started, type(e).__name__)
+                delay = self._retry_delay(attempt, retry)
+                if delay is None:
+                    raise
+                self._record_retry(method, labels, None)
+            else:
+                self._record_attempt(method, labels, started, response.status_code)
+                self._bucket.update_from_headers(response.headers)
+                delay = self._retry_delay(attempt, retry, response)
+                if delay is None:
+                    return response
+                self._record_retry(method, labels, response)
+                await response.aclose()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Dict[str, Any]] = None,
+        retry: Optional[bool] = None,
+    ) -> FocusNFeResponse:
+        async def call() -> FocusNFeResponse:
+            response = await self._send(
+                method,
+                endpoint,
+                retry=retry,
+                params=params,
+                content=json_dumps(json) if json is not None else None,
+            )
+            return FocusNFeResponse.from_httpx(response)
+
+        key = self._coalesce_key(method, endpoint, params)
+        if key is None:
+            return await call()
+        return await _async_inflight.do(key, call)
+
+    async def download_document(self, doc_type: str, referencia: str, ext: str) -> httpx.Response:
+        ext = ext.lstrip(".").lower()
+        started = time.perf_counter()
+        response = await self._send("GET", f"/v2/{doc_type}/{referencia}.{ext}")
+        self._record_download(doc_type, ext, started, response.is_success, len(response.content))
+        return response
+
+    async def _fetch_page(self, endpoint: str, params: Optional[Dict[str, Any]], page: int, page_size: Optional[int]) -> FocusNFeResponse:
+        return await self._request("GET", endpoint, params=self._page_params(params, page, page_size))
+
+    async def _iter_items(self, endpoint: str, params: Optional[Dict[str, Any]], page_size: Optional[int]) -> AsyncIterator[Any]:
+        seen = 0
+        page = 1
+        next_page: Optional[asyncio.Task] = asyncio.create_task(self._fetch_page(endpoint, params, page, page_size))
+        try:
+            while True:
+                items, last = self._page_items(await next_page, page_size, seen)
+                next_page = None
+                if not last:
+                    page += 1
+                    next_page = asyncio.create_task(self._fetch_page(endpoint, params, page, page_size))
+                for item in items:
+                    yield item
+                if last:
+                    return
+                seen += len(items)
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    async def consultar_municipio(self, codigo_ibge: str) -> FocusNFeResponse:
+        """
+        Retorna os requisitos do município para emissão de NFSe.
+        Usa o `MUNICIPIO_CACHE` com stale-while-revalidate: uma entrada vencida
+        é servida imediatamente enquanto é atualizada em segundo plano.
+        """
+        key = self._municipio_cache_key(codigo_ibge)
+        body, state = await MUNICIPIO_CACHE.aget(key)
+        if state == STALE and MUNICIPIO_CACHE.begin_refresh(key):
+            task = asyncio.create_task(self._refresh_municipio(codigo_ibge, key))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        if state is not None:
+            return FocusNFeResponse.from_cache(body, state)
+
+        response = await self._request("GET", f"/v2/municipios/{codigo_ibge}")
+        if response.ok:
+            await MUNICIPIO_CACHE.aset(key, response.body)
+        return response
+
+    async def _refresh_municipio(self, codigo_ibge: str, key: str) -> None:
+        try:
+            response = await self._request("GET", f"/v2/municipios/{codigo_ibge}")
+            if response.ok:
+                await MUNICIPIO_CACHE.aset(key, response.body)
+        except httpx.HTTPError:
+            pass
+        finally:
+            MUNICIPIO_CACHE.end_refresh(key)
+
+    async def download_document_to(
+        self,
+        doc_type: str,
+        referencia: str,
+        ext: str,
+        dest_path: str,
+        *,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    ) -> DownloadResult:
+        """
+        Versão assíncrona de `FocusNFeClient.download_document_to`. As
+        operações de disco (criação, escrita dos blocos e rename) rodam em
+        threads, fora do event loop.
+        """
+        ext = ext.lstrip(".").lower()
+        started = time.perf_counter()
+        response = await self._send("GET", f"/v2/{doc_type}/{referencia}.{ext}", stream=True)
+        try:
+            if not response.is_success:
+                await response.aread()
+                result = DownloadResult(status_code=response.status_code, ok=False, error=response.text)
+            else:
+                writer = await asyncio.to_thread(_AtomicFileWriter, dest_path)
+                try:
+                    async for chunk in response.aiter_bytes(chunk_size):
+                        await asyncio.to_thread(writer.write, chunk)
+                    result = await asyncio.to_thread(writer.commit, response.status_code)
+                except BaseException:
+                    writer.abort()
+                    raise
+        finally:
+            await response.aclose()
+        self._record_download(doc_type, ext, started, result.ok, result.size)
+        return result
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "AsyncFocusNFeClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
@@ -0,0 +1,280 @@
+"""
+Métricas no formato de exposição de texto do Prometheus.
+
+Implementação mínima (sem dependências) de contadores, gauges e histogramas
+com labels, suficiente para o endpoint `/metrics` da aplicação.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: labels esperados {self.labelnames}, recebidos {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """Gauge com valor explícito (`set`/`inc`/`dec`) ou lido de uma função no momento da coleta."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Lê o valor de `function` a cada coleta (apenas gauges sem labels)."""
+        self._function = function
+
+    def samples(self) -> Iterable[str]:
+        if self._function is not None:
+            yield f"{self.name} {_format_value(float(self._function()))}"
+            return
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Por série: contagem por bucket (não cumulativa), soma e total
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica já registrada: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- Cliente Focus ---------------------------------------------------------
+
+FOCUS_REQUEST_SECONDS = REGISTRY.histogram(
+    "focus_nfe_request_duration_seconds",
+    "Latência de cada tentativa de requisição à API Focus (até os cabeçalhos da resposta).",
+    ("method", "endpoint", "doc_type"),
+)
+FOCUS_REQUESTS = REGISTRY.counter(
+    "focus_nfe_requests_total",
+    "Tentativas de requisição à API Focus por status HTTP (ou tipo de erro de transporte).",
+    ("method", "endpoint", "doc_type", "status"),
+)
+FOCUS_RETRIES = REGISTRY.counter(
+    "focus_nfe_retries_total",
+    "Retentativas de requisições à API Focus por motivo (429, 5xx ou transport).",
+    ("method", "endpoint", "doc_type", "reason"),
+)
+FOCUS_RATE_LIMIT_WAIT_SECONDS = REGISTRY.counter(
+    "focus_nfe_rate_limit_wait_seconds_total",
+    "Tempo total de espera imposto pelo rate limit local do token.",
+)
+FOCUS_IN_FLIGHT = REGISTRY.gauge(
+    "focus_nfe_requests_in_flight",
+    "Requisições à API Focus em andamento neste processo.",
+)
+FOCUS_DOWNLOAD_SECONDS = REGISTRY.histogram(
+    "focus_nfe_download_duration_seconds",
+    "Duração total de downloads de PDF/XML (incluindo a escrita em disco).",
+    ("doc_type", "ext"),
+)
+FOCUS_DOWNLOAD_BYTES = REGISTRY.counter(
+    "focus_nfe_download_bytes_total",
+    "Bytes de PDF/XML baixados da API Focus.",
+    ("doc_type", "ext"),
+)
+
+# --- Fila de webhooks -------------------------------------------------------
+
+WEBHOOK_JOBS = REGISTRY.counter(
+    "focus_nfe_webhook_jobs_total",
+    "Jobs da fila de webhooks finalizados por resultado (done, retry ou failed) e tipo (webhook ou documents).",
+    ("result", "kind"),
+)
+WEBHOOK_BATCH_SECONDS = REGISTRY.histogram(
+    "focus_nfe_webhook_batch_duration_seconds",
+    "Duração do processamento de cada lote de jobs da fila de webhooks (uma transação), por tipo de job.",
+    ("kind",),
+)
+WEBHOOK_COALESCED = REGISTRY.counter(
+    "focus_nfe_webhook_coalesced_total",
+    "Webhooks cujo status foi substituído por uma atualização mais recente da mesma ref no lote.",
+)
+WEBHOOK_IGNORED = REGISTRY.counter(
+    "focus_nfe_webhook_ignored_total",
+    "Webhooks confirmados sem processamento por motivo (duplicate ou out_of_order).",
+    ("reason",),
+)
+
+# --- Aplicação (FastAPI) ---------------------------------------------------
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições atendidas pela API, por rota.",
+    ("method", "route", "status"),
+)
+
+
+def endpoint_labels(endpoint: str) -> Tuple[str, str]:
+    """
+    Normaliza um caminho da Focus para uso como label, trocando a referência
+    por `{ref}` para não explodir a cardinalidade. Retorna (endpoint, doc_type).
+
+    Ex: "/v2/nfe/PED-1.pdf" -> ("/v2/nfe/{ref}.pdf", "nfe")
+    """
+    parts = [part for part in endpoint.split("?", 1)[0].split("/") if part]
+    if len(parts) < 2:
+        return "/" + "/".join(parts), ""
+    doc_type = parts[1]
+    template = parts[:2]
+    if len(parts) > 2:
+        ref = parts[2]
+        ext = ref.rsplit(".", 1)[1].lower() if "." in ref else ""
+        template.append("{ref}." + ext if ext in ("pdf", "xml", "json") else "{ref}")
+        template.extend(parts[3:])
+    return "/" + "/".join(template), doc_type
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, JSON, Boolean, ForeignKey, Index, Numeric
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -14,14 +14,42 @@ class Invoice(Base):
     type = Column(String(20), default="nfse", index=True) # nfse, nfe, nfce, cte, mdfe
     status = Column(String(20), default="processing")
     payload = Column(JSON)
+    payload_hash = Column(String(64)) # SHA-256 do payload canônico (idempotência da emissão)
     response_data = Column(JSON)
     pdf_url = Column(String(255))
     xml_url = Column(String(255))
+    focus_token = Column(String(100)) # X-Focus-Token do tenant que emitiu a nota (nulo = token padrão do .env)
+    resend_count = Column(Integer, default=0) # Reenvios após rejeição; escopo da deduplicação dos webhooks
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Campos fiscais extraídos do payload/resposta na gravação (ver fiscal.py)
+    cnpj_emitente = Column(String(14), index=True)
+    documento_destinatario = Column(String(14), index=True) # CNPJ ou CPF
+    chave = Column(String(44), index=True)
+    numero = Column(String(20))
+    serie = Column(String(5))
+    valor_total = Column(Numeric(15, 2), index=True)
+    data_emissao = Column(DateTime, index=True)
+
     # Relacionamento com eventos (Timeline)
-    events = relationship("InvoiceEvent", back_populates="invoice", cascade="all, delete-orphan")
+    events = relationship(
+        "InvoiceEvent",
+        back_populates="invoice",
+        cascade="all, delete-orphan",
+        order_by="(InvoiceEvent.created_at, InvoiceEvent.id)",
+    )
+
+    # Listagem do dashboard: ordem (created_at, id) decrescente, com filtros por tipo ou status
+    __table_args__ = (
+        Index("ix_invoices_created_at_id", "created_at", "id"),
+        Index("ix_invoices_type_created_at_id", "type", "created_at", "id"),
+        Index("ix_invoices_status_created_at_id", "status", "created_at", "id"),
+        # Busca fiscal: notas de um emitente por período e por número/série, e número/série sem emitente
+        Index("ix_invoices_cnpj_emitente_data_emissao", "cnpj_emitente", "data_emissao"),
+        Index("ix_invoices_cnpj_emitente_serie_numero", "cnpj_emitente", "serie", "numero"),
+        Index("ix_invoices_numero_serie", "numero", "serie"),
+    )
 
 class InvoiceEvent(Base):
     __tablename__ = "invoice_events"
@@ -35,10 +63,62 @@ class InvoiceEvent(Base):
 
     invoice = relationship("Invoice", back_populates="events")
 
+    # Timeline de uma nota em ordem cronológica, paginada por (created_at, id)
+    __table_args__ = (
+        Index("ix_invoice_events_invoice_id_created_at_id", "invoice_id", "created_at", "id"),
+    )
+
+class InvoiceCounter(Base):
+    """Quantidade de notas por dia de criação, tipo e status atual (estatísticas do dashboard)."""
+    __tablename__ = "invoice_counters"
+
+    day = Column(Date, primary_key=True)
+    type = Column(String(20), primary_key=True)
+    status = Column(String(50), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
 class WebhookLog(Base):
     __tablename__ = "webhook_logs"
 
     id = Column(Integer, primary_key=True, index=True)
     provider = Column(String(50), default="focusnfe")
     payload = Column(JSON)
+    payload_hash = Column(String(64), unique=True, index=True) # SHA-256 do payload canônico + geração de reenvio da nota; reenvios idênticos são descartados
     received_at = Column(DateTime, default=datetime.utcnow)
+
+class WebhookJob(Base):
+    """
+    Fila persistente de processamento dos webhooks: um job `webhook` por
+    `WebhookLog` e, para notas autorizadas, um job `documents` com o download
+    de PDF/XML (ligado ao log que autorizou a nota).
+    """
+    __tablename__ = "webhook_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    webhook_log_id = Column(Integer, ForeignKey("webhook_logs.id"), nullable=False)
+    kind = Column(String(20), default="webhook") # webhook, documents (nulo: job anterior à coluna, webhook)
+    ref = Column(String(50), index=True)
+    status = Column(String(20), nullable=False, default="pending") # pending, processing, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow) # próxima tentativa
+    locked_by = Column(String(64)) # token do claim do worker
+    locked_until = Column(DateTime) # fim do lease; vencido, o job volta a ser elegível
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    log = relationship("WebhookLog")
+
+    # Claim: jobs pendentes por ordem de disponibilidade, e leases vencidos
+    __table_args__ = (
+        Index("ix_webhook_jobs_status_available_at", "status", "available_at"),
+        Index("ix_webhook_jobs_status_locked_until", "status", "locked_until"),
+    )
+
+class CacheEntry(Base):
+    __tablename__ = "cache_entries"
+
+    namespace = Column(String(50), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    data = Column(JSON)
+    stored_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,113 @@
+"""Controle de taxa por token e política de retentativas para a API Focus."""
+
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from typing import Dict, Mapping, Optional
+
+# A Focus pode enviar os cabeçalhos com ou sem o prefixo "X-".
+LIMIT_HEADERS = ("X-RateLimit-Limit", "RateLimit-Limit")
+REMAINING_HEADERS = ("X-RateLimit-Remaining", "RateLimit-Remaining")
+RESET_HEADERS = ("X-RateLimit-Reset", "RateLimit-Reset")
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _header_number(headers: Mapping[str, str], names) -> Optional[float]:
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+class TokenBucket:
+    """
+    Token bucket de um token da Focus. `reserve()` consome uma ficha e
+    retorna quanto tempo o chamador deve esperar antes de enviar a requisição
+    (o saldo pode ficar negativo, enfileirando as próximas chamadas).
+
+    Os limites são ajustados pelos cabeçalhos de rate limit das respostas.
+    """
+
+    def __init__(self, limit: float, window: float) -> None:
+        self.window = window
+        self.capacity = limit
+        self.rate = limit / window
+        self.tokens = limit
+        self.blocked_until = 0.0
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(wait, self.blocked_until - now)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        limit = _header_number(headers, LIMIT_HEADERS)
+        remaining = _header_number(headers, REMAINING_HEADERS)
+        reset = _header_number(headers, RESET_HEADERS)
+        if limit is None and remaining is None:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if limit and limit > 0:
+                self.capacity = limit
+                self.rate = limit / self.window
+            if remaining is not None:
+                self.tokens = min(self.tokens, remaining)
+                if remaining <= 0 and reset:
+                    self.blocked_until = max(self.blocked_until, now + reset)
+
+    def pause(self, seconds: float) -> None:
+        """Suspende o envio por `seconds` (ex: após um 429)."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_token_bucket(token: str) -> TokenBucket:
+    """Retorna o bucket compartilhado (no processo) do token informado."""
+    with _buckets_lock:
+        bucket = _buckets.get(token)
+        if bucket is None:
+            bucket = TokenBucket(
+                limit=float(os.environ.get("FOCUS_NFE_RATE_LIMIT") or 100),
+                window=float(os.environ.get("FOCUS_NFE_RATE_LIMIT_WINDOW_S") or 60),
+            )
+            _buckets[token] = bucket
+        return bucket
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Backoff exponencial com full jitter."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Tempo de espera sugerido pela Focus em um 429 (Retry-After ou reset)."""
+    value = _header_number(headers, ("Retry-After",))
+    if value is None:
+        value = _header_number(headers, RESET_HEADERS)
+    return value
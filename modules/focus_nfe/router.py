@@ -1,19 +1,42 @@
-from fastapi import APIRouter, HTTPException, Depends, Query, Header
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from .focus_client import FocusNFeClient
+from fastapi import APIRouter, HTTPException, Depends, Query, Header, Request
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, load_only, selectinload
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+from .focus_client import AsyncFocusNFeClient, FocusNFeError, FocusNFeResponse, json_dumps, municipio_cache_key, resolve_base_url
+from .cache import MUNICIPIO_CACHE
+from .client_pool import focus_client_pool
+from .singleflight import AsyncSingleFlight
 from .schemas import (
     NFSeCreate, NFSeResponse,
     NFeCreate, NFeResponse,
     MDeRequest,
     NFCeCreate, NFCeResponse,
     CTeCreate, CTeResponse,
-    MDFeCreate, MDFeResponse
+    MDFeCreate, MDFeResponse,
+    BatchItem, BatchItemResult
 )
-from .database import get_db
+from .database import SessionLocal, get_db
 from .models import Invoice, InvoiceEvent
+from .counters import read_stats, record_created, record_status_change
+from .events import status_broker, status_event
+from .fiscal import apply_fiscal_fields, extract_fiscal_fields
+from .export import EXPORT_FORMATS, export_query, parquet_available, stream_export
+from datetime import date, datetime
+from contextlib import aclosing
+import asyncio
+import base64
+import hashlib
+import httpx
+import json
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 nfse_router = APIRouter(prefix="/nfse", tags=["NFSe"])
 nfe_router = APIRouter(prefix="/nfe", tags=["NFe"])
 nfce_router = APIRouter(prefix="/nfce", tags=["NFCe"])
@@ -22,45 +45,295 @@ mdfe_router = APIRouter(prefix="/mdfe", tags=["MDFe"])
 received_router = APIRouter(prefix="/recebidos", tags=["Recebidos"])
 dashboard_router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 local_data_router = APIRouter(prefix="/local", tags=["Local Data"])
+batch_router = APIRouter(tags=["Lotes"])
 
 # Main router for this module
 router = APIRouter()
 
-def _save_invoice(db: Session, ref: str, doc_type: str, payload: dict, response: dict) -> Invoice:
-    """Cria a nota e o primeiro evento no banco de dados."""
-    db_invoice = Invoice(
-        referencia=ref,
-        external_id=str(response.get("id")) if response.get("id") else None,
-        type=doc_type,
-        status=response.get("status", "processing"),
-        payload=payload,
-        response_data=response
-    )
-    db.add(db_invoice)
+def _emission_payload(document: BaseModel) -> dict:
+    """
+    Payload enviado à Focus e gravado na nota, igual nas emissões avulsas e em
+    lote (datas em ISO 8601 pelo `jsonable_encoder`), para que o mesmo
+    conteúdo tenha o mesmo `payload_hash` pelos dois caminhos.
+    """
+    return jsonable_encoder(document.model_dump(exclude_unset=True))
+
+def _payload_hash(payload: dict) -> str:
+    """SHA-256 do payload em JSON canônico (chaves ordenadas, datas em ISO 8601)."""
+    canonical = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def _tenant_token(client: AsyncFocusNFeClient) -> Optional[str]:
+    """Token do tenant que emitiu a nota (X-Focus-Token), ou None para o token padrão do .env."""
+    return None if client.token == os.environ.get("FOCUS_NFE_TOKEN") else client.token
+
+def _save_invoices(
+    db: Session, doc_type: str, emitted: List[Tuple[str, dict, dict]], focus_token: Optional[str] = None
+) -> List[Invoice]:
+    """
+    Cria as notas e seus primeiros eventos em uma única transação.
+    `emitted` é uma lista de (ref, payload, resposta da Focus); `focus_token`
+    é o token do tenant que as emitiu (None = token padrão).
+    """
+    invoices = [
+        Invoice(
+            referencia=ref,
+            external_id=str(response.get("id")) if response.get("id") else None,
+            type=doc_type,
+            status=response.get("status", "processing"),
+            # Datas do schema (ex: data_emissao) precisam virar texto para a coluna JSON
+            payload=jsonable_encoder(payload),
+            payload_hash=_payload_hash(payload),
+            response_data=response,
+            focus_token=focus_token,
+            **extract_fiscal_fields(doc_type, payload, response)
+        )
+        for ref, payload, response in emitted
+    ]
+    db.add_all(invoices)
     db.flush()
-    
+    record_created(db, invoices)
+
     # Registrar evento inicial na timeline
-    db.add(InvoiceEvent(
-        invoice_id=db_invoice.id,
-        status="enviado",
-        message=f"{doc_type.upper()} enviada para a FocusNFE",
-        data=response
-    ))
+    db.add_all([
+        InvoiceEvent(
+            invoice_id=invoice.id,
+            status="enviado",
+            message=f"{doc_type.upper()} enviada para a FocusNFE",
+            data=invoice.response_data
+        )
+        for invoice in invoices
+    ])
+    events = [status_event(invoice) for invoice in invoices]
     db.commit()
-    return db_invoice
+    for event in events:
+        status_broker.publish(event)
+    return invoices
+
+
+def _save_invoice(
+    db: Session, ref: str, doc_type: str, payload: dict, response: dict, focus_token: Optional[str] = None
+) -> Invoice:
+    """Cria a nota e o primeiro evento no banco de dados."""
+    return _save_invoices(db, doc_type, [(ref, payload, response)], focus_token)[0]
+
+# Status em que a Focus aceita reenviar a nota com o mesmo ref (ex: payload corrigido)
+RESENDABLE_STATUSES = {"erro_autorizacao"}
+
+def _can_resend(invoice: Invoice, doc_type: str) -> bool:
+    return invoice.type == doc_type and invoice.status in RESENDABLE_STATUSES
+
+def _save_resent_invoices(
+    db: Session, doc_type: str, resent: List[Tuple[Invoice, dict, dict]], focus_token: Optional[str] = None
+) -> None:
+    """
+    Atualiza notas rejeitadas que foram reenviadas à Focus: payload, hash,
+    resposta, status, token do tenant, contadores e a geração de reenvio
+    (`resend_count`, que separa a deduplicação dos webhooks da nova
+    tentativa), com um evento na timeline, em uma única transação. `resent` é uma lista de (nota,
+    payload, resposta da Focus).
+    """
+    events = []
+    for invoice, payload, response in resent:
+        previous = invoice.status
+        status = response.get("status", "processing")
+        invoice.payload = jsonable_encoder(payload)
+        invoice.payload_hash = _payload_hash(payload)
+        invoice.response_data = response
+        invoice.focus_token = focus_token
+        invoice.resend_count = (invoice.resend_count or 0) + 1
+        if response.get("id"):
+            invoice.external_id = str(response["id"])
+        invoice.status = status
+        apply_fiscal_fields(invoice)
+        record_status_change(db, invoice, previous, status)
+        db.add(InvoiceEvent(
+            invoice_id=invoice.id,
+            status="reenviado",
+            message=f"{doc_type.upper()} reenviada para a FocusNFE após {previous}",
+            data=response
+        ))
+        if status != previous:
+            events.append(status_event(invoice, previous))
+    db.commit()
+    for event in events:
+        status_broker.publish(event)
+
+def _same_emission(invoice: Invoice, doc_type: str, payload_hash: str) -> bool:
+    """Indica se a nota gravada corresponde à mesma emissão (tipo e payload)."""
+    stored_hash = invoice.payload_hash or _payload_hash(invoice.payload or {})
+    return invoice.type == doc_type and stored_hash == payload_hash
+
+def _stored_emission(invoice: Invoice, doc_type: str, payload_hash: str) -> dict:
+    """Resposta de uma emissão já registrada, ou 409 se o ref foi usado com outro conteúdo."""
+    if not _same_emission(invoice, doc_type, payload_hash):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Referência '{invoice.referencia}' já utilizada em outra emissão com conteúdo diferente."
+        )
+    return invoice.response_data
+
+_emission_inflight = AsyncSingleFlight()
+
+async def _emit_document(
+    doc_type: str,
+    ref: str,
+    payload: dict,
+    client: AsyncFocusNFeClient,
+    db: Session,
+) -> dict:
+    """
+    Emite um documento de forma idempotente pelo `ref`.
+
+    Se a nota já existe no banco com o mesmo payload, a resposta gravada é
+    devolvida sem chamar a Focus; com payload diferente, retorna 409. A
+    exceção é a nota rejeitada (`RESENDABLE_STATUSES`): ela é reenviada à
+    Focus e a nota gravada é atualizada com o novo payload e a nova resposta.
+    Retentativas simultâneas do mesmo ref e payload compartilham um único
+    envio, e a corrida na gravação (unique em `referencia`) cai no mesmo
+    tratamento de nota existente.
+    """
+    payload_hash = _payload_hash(payload)
+    invoice = db.query(Invoice).filter(Invoice.referencia == ref).first()
+    if invoice is not None and not _can_resend(invoice, doc_type):
+        return _stored_emission(invoice, doc_type, payload_hash)
+    resend = invoice is not None
+    focus_token = _tenant_token(client)
+
+    async def send() -> dict:
+        response = await client.create_document(doc_type, ref, payload)
+        if not response.ok:
+            raise HTTPException(status_code=response.status_code, detail=response.body)
+        # Sessão própria: o envio é compartilhado com outras requisições e pode
+        # continuar depois que a requisição que o iniciou (e a sessão dela) terminar
+        with SessionLocal() as session:
+            if resend:
+                stored = session.query(Invoice).filter(Invoice.referencia == ref).first()
+                _save_resent_invoices(session, doc_type, [(stored, payload, response.body)], focus_token)
+                return response.body
+            try:
+                _save_invoice(session, ref, doc_type, payload, response.body, focus_token)
+            except IntegrityError:
+                session.rollback()
+                stored = session.query(Invoice).filter(Invoice.referencia == ref).first()
+                return _stored_emission(stored, doc_type, payload_hash)
+            return response.body
+
+    return await _emission_inflight.do((doc_type, ref, payload_hash), send)
 
 
-def get_focus_client(x_focus_token: Optional[str] = Header(None, description="Token da Focus NFe para multi-clientes")):
+async def get_focus_client(x_focus_token: Optional[str] = Header(None, description="Token da Focus NFe para multi-clientes")):
     """
-    Injeta o cliente FocusNFE. 
+    Injeta o cliente FocusNFE (assíncrono, para não bloquear o event loop).
     Se o header X-Focus-Token for enviado, usa ele para autenticação.
     Caso contrário, usa o token padrão do .env.
+    O cliente vem do pool do processo, reaproveitando conexões entre chamadas.
     """
-    client = FocusNFeClient(token=x_focus_token)
-    try:
+    async with focus_client_pool.lease(x_focus_token) as client:
         yield client
-    finally:
-        client.close()
+
+# Cabeçalhos da resposta da Focus que não valem para a resposta repassada: hop-by-hop,
+# os que o Starlette/uvicorn recalculam e os do corpo (o httpx já o descomprimiu)
+_NOT_FORWARDED_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailer",
+    "transfer-encoding", "upgrade", "content-length", "content-encoding", "content-type",
+    "date", "server", "set-cookie",
+}
+
+def _passthrough(response: FocusNFeResponse) -> Response:
+    """
+    Repassa o corpo da Focus como veio (bytes), sem decodificar e recodificar
+    o JSON, com os cabeçalhos da resposta (ex: `X-Cache` das respostas do
+    cache de municípios). Em caso de erro, o corpo é decodificado para o
+    HTTPException.
+    """
+    if not response.ok:
+        raise HTTPException(status_code=response.status_code, detail=response.body)
+    return Response(
+        content=response.content,
+        status_code=response.status_code,
+        media_type=response.headers.get("Content-Type", "application/json"),
+        headers={
+            name: value for name, value in response.headers.items()
+            if name.lower() not in _NOT_FORWARDED_HEADERS
+        },
+    )
+
+# Status a partir dos quais a nota não muda sem uma ação nossa (cancelamento)
+# ou um webhook da Focus, que também atualizam a cópia local.
+TERMINAL_STATUSES = {"autorizado", "cancelado", "erro_autorizacao", "denegado"}
+LOCAL_STATUS_TTL_S = float(os.getenv("FOCUS_NFE_LOCAL_STATUS_TTL_S") or 3600)
+
+def _is_fresh_terminal(invoice: Invoice) -> bool:
+    if invoice.status not in TERMINAL_STATUSES or not invoice.response_data:
+        return False
+    synced_at = invoice.updated_at or invoice.created_at
+    return (datetime.utcnow() - synced_at).total_seconds() <= LOCAL_STATUS_TTL_S
+
+def _local_response(invoice: Invoice, served_from: str) -> Response:
+    return Response(
+        content=json_dumps(invoice.response_data),
+        media_type="application/json",
+        headers={"X-Served-From": served_from},
+    )
+
+def _sync_local_status(db: Session, invoice: Invoice, body: dict, origin: str) -> None:
+    """Atualiza a cópia local com a resposta da Focus, registrando mudanças de status."""
+    previous = invoice.status
+    status = body.get("status") or previous
+    if status != previous:
+        db.add(InvoiceEvent(
+            invoice_id=invoice.id,
+            status=status,
+            message=f"Atualização obtida via {origin}: {status}",
+            data=body
+        ))
+        record_status_change(db, invoice, previous, status)
+    invoice.status = status
+    invoice.response_data = body
+    apply_fiscal_fields(invoice)
+    # Marca a sincronização mesmo quando nada mudou (base do TTL da leitura local)
+    invoice.updated_at = datetime.utcnow()
+    event = status_event(invoice, previous) if status != previous else None
+    db.commit()
+    if event is not None:
+        status_broker.publish(event)
+
+async def _consult_document(
+    doc_type: str,
+    ref: str,
+    refresh: bool,
+    client: AsyncFocusNFeClient,
+    db: Session,
+) -> Response:
+    """
+    Consulta uma nota, respondendo da tabela `invoices` quando o status já é
+    terminal e a cópia local foi sincronizada há menos de
+    `FOCUS_NFE_LOCAL_STATUS_TTL_S`. Caso contrário consulta a Focus e atualiza
+    a cópia local. O cabeçalho `X-Served-From` indica a origem: `local`,
+    `upstream` ou `local-stale` (Focus indisponível).
+    """
+    invoice = db.query(Invoice).filter(Invoice.referencia == ref, Invoice.type == doc_type).first()
+    if invoice is not None and not refresh and _is_fresh_terminal(invoice):
+        return _local_response(invoice, "local")
+
+    has_terminal_copy = invoice is not None and invoice.status in TERMINAL_STATUSES and bool(invoice.response_data)
+    try:
+        response = await client.get_document(doc_type, ref, completa=1)
+    except httpx.HTTPError:
+        if has_terminal_copy:
+            return _local_response(invoice, "local-stale")
+        raise
+    if response.status_code >= 500 and has_terminal_copy:
+        return _local_response(invoice, "local-stale")
+
+    if response.ok and invoice is not None:
+        _sync_local_status(db, invoice, response.body, "consulta")
+    result = _passthrough(response)
+    result.headers["X-Served-From"] = "upstream"
+    return result
+
+_REFRESH_QUERY = Query(False, description="Ignora a cópia local e consulta a Focus")
 
 # --- NFSe (Serviço) ---
 
@@ -68,41 +341,52 @@ def get_focus_client(x_focus_token: Optional[str] = Header(None, description="To
 async def emit_invoice(
     nfse: NFSeCreate,
     ref: str,
-    client: FocusNFeClient = Depends(get_focus_client),
+    client: AsyncFocusNFeClient = Depends(get_focus_client),
     db: Session = Depends(get_db)
 ):
     """Emite uma nova NFSe."""
-    payload = nfse.dict(exclude_unset=True)
-    response = client.emitir_nfse(ref, payload)
-    
-    if not response.ok:
-        raise HTTPException(status_code=response.status_code, detail=response.body)
-    
-    _save_invoice(db, ref, "nfse", payload, response.body)
-    
-    return response.body
+    payload = _emission_payload(nfse)
+    return await _emit_document("nfse", ref, payload, client, db)
 
 @nfse_router.get("/", response_model=List[NFSeResponse])
 async def list_invoices(
     status: Optional[str] = Query(None),
     cnpj_prestador: Optional[str] = Query(None),
-    client: FocusNFeClient = Depends(get_focus_client)
+    client: AsyncFocusNFeClient = Depends(get_focus_client)
 ):
     """Lista as últimas NFSe."""
-    response = client.listar_nfse(cnpj_prestador=cnpj_prestador, status=status)
-    if not response.ok:
-        raise HTTPException(status_code=response.status_code, detail=response.body)
-    return response.body
+    response = await client.listar_nfse(cnpj_prestador=cnpj_prestador, status=status)
+    return _passthrough(response)
 
 @nfse_router.get("/municipio/{ibge}")
-async def check_city_requirements(ibge: str, client: FocusNFeClient = Depends(get_focus_client)):
+async def check_city_requirements(ibge: str, client: AsyncFocusNFeClient = Depends(get_focus_client)):
     """
     Consulta requisitos municipais para emissão.
     """
-    response = client.consultar_municipio(ibge)
-    if not response.ok:
-        raise HTTPException(status_code=response.status_code, detail=response.body)
-    return response.body
+    response = await client.consultar_municipio(ibge)
+    return _passthrough(response)
+
+@nfse_router.delete("/municipio/cache")
+async def clear_city_requirements_cache():
+    """Descarta o cache de requisitos de todos os municípios (não consulta a Focus nem exige token)."""
+    await MUNICIPIO_CACHE.ainvalidate()
+    return {"status": "invalidated"}
+
+@nfse_router.delete("/municipio/{ibge}/cache")
+async def invalidate_city_requirements(ibge: str):
+    """Descarta o cache de requisitos de um município (não consulta a Focus nem exige token)."""
+    await MUNICIPIO_CACHE.ainvalidate(municipio_cache_key(resolve_base_url(), ibge))
+    return {"status": "invalidated", "ibge": ibge}
+
+@nfse_router.get("/{ref}", response_model=NFSeResponse)
+async def get_nfse(
+    ref: str,
+    refresh: bool = _REFRESH_QUERY,
+    client: AsyncFocusNFeClient = Depends(get_focus_client),
+    db: Session = Depends(get_db)
+):
+    """Consulta detalhes de uma NFSe."""
+    return await _consult_document("nfse", ref, refresh, client, db)
 
 # --- NFe (Produtos) ---
 
@@ -110,43 +394,43 @@ async def check_city_requirements(ibge: str, client: FocusNFeClient = Depends(ge
 async def emit_nfe(
     nfe: NFeCreate,
     ref: str,
-    client: FocusNFeClient = Depends(get_focus_client),
+    client: AsyncFocusNFeClient = Depends(get_focus_client),
     db: Session = Depends(get_db)
 ):
     """Emite uma nova NFe."""
-    payload = nfe.dict(exclude_unset=True)
-    response = client.emitir_nfe(ref, payload)
-    
-    if not response.ok:
-        raise HTTPException(status_code=response.status_code, detail=response.body)
-    
-    _save_invoice(db, ref, "nfe", payload, response.body)
-    
-    return response.body
+    payload = _emission_payload(nfe)
+    return await _emit_document("nfe", ref, payload, client, db)
 
 @nfe_router.get("/{ref}", response_model=NFeResponse)
-async def get_nfe(ref: str, client: FocusNFeClient = Depends(get_focus_client)):
+async def get_nfe(
+    ref: str,
+    refresh: bool = _REFRESH_QUERY,
+    client: AsyncFocusNFeClient = Depends(get_focus_client),
+    db: Session = Depends(get_db)
+):
     """Consulta detalhes de uma NFe."""
-    response = client.consultar_nfe(ref)
-    if not response.ok:
-        raise HTTPException(status_code=response.status_code, detail=response.body)
-    return response.body
+    return await _consult_document("nfe", ref, refresh, client, db)
 
 @nfe_router.delete("/{ref}")
-async def cancel_nfe(ref: str, justificativa: str, client: FocusNFeClient = Depends(get_focus_client)):
+async def cancel_nfe(
+    ref: str,
+    justificativa: str,
+    client: AsyncFocusNFeClient = Depends(get_focus_client),
+    db: Session = Depends(get_db)
+):
     """Cancela uma NFe."""
-    response = client.cancelar_nfe(ref, justificativa)
-    if not response.ok:
-        raise HTTPException(status_code=response.status_code, detail=response.body)
-    return response.body
+    response = await client.cancelar_nfe(ref, justificativa)
+    if response.ok:
+        invoice = db.query(Invoice).filter(Invoice.referencia == ref, Invoice.type == "nfe").first()
+        if invoice is not None:
+            _sync_local_status(db, invoice, response.body, "cancelamento")
+    return _passthrough(response)
 
 @nfe_router.post("/{ref}/carta_correcao")
-async def post_nfe_correcao(ref: str, texto: str, client: FocusNFeClient = Depends(get_focus_client)):
+async def post_nfe_correcao(ref: str, texto: str, client: AsyncFocusNFeClient = Depends(get_focus_client)):
     """Cria uma Carta de Correção Eletrônica para a NFe."""
-    response = client.carta_correcao_nfe(ref, texto)
-    if not response.ok:
-        raise HTTPException(status_code=response.status_code, detail=response.body)
-    return response.body
+    response = await client.carta_correcao_nfe(ref, texto)
+    return _passthrough(response)
 
 # --- NFCe (Varejo) ---
 
@@ -154,19 +438,22 @@ async def post_nfe_correcao(ref: str, texto: str, client: FocusNFeClient = Depen
 async def emit_nfce(
     nfce: NFCeCreate,
     ref: str,
-    client: FocusNFeClient = Depends(get_focus_client),
+    client: AsyncFocusNFeClient = Depends(get_focus_client),
     db: Session = Depends(get_db)
 ):
     """Emite uma nova NFCe (Varejo)."""
-    payload = nfce.dict(exclude_unset=True)
-    response = client.create_document("nfce", ref, payload)
-    
-    if not response.ok:
-        raise HTTPException(status_code=response.status_code, detail=response.body)
-    
-    _save_invoice(db, ref, "nfce", payload, response.body)
-    
-    return response.body
+    payload = _emission_payload(nfce)
+    return await _emit_document("nfce", ref, payload, client, db)
+
+@nfce_router.get("/{ref}", response_model=NFCeResponse)
+async def get_nfce(
+    ref: str,
+    refresh: bool = _REFRESH_QUERY,
+    client: AsyncFocusNFeClient = Depends(get_focus_client),
+    db: Session = Depends(get_db)
+):
+    """Consulta detalhes de uma NFCe."""
+    return await _consult_document("nfce", ref, refresh, client, db)
 
 # --- CTe (Transporte) ---
 
@@ -174,19 +461,22 @@ async def emit_nfce(
 async def emit_cte(
     cte: CTeCreate,
     ref: str,
-    client: FocusNFeClient = Depends(get_focus_client),
+    client: AsyncFocusNFeClient = Depends(get_focus_client),
     db: Session = Depends(get_db)
 ):
     """Emite um novo CTe."""
-    payload = cte.dict(exclude_unset=True)
-    response = client.emitir_cte(ref, payload)
-    
-    if not response.ok:
-        raise HTTPException(status_code=response.status_code, detail=response.body)
-    
-    _save_invoice(db, ref, "cte", payload, response.body)
-    
-    return response.body
+    payload = _emission_payload(cte)
+    return await _emit_document("cte", ref, payload, client, db)
+
+@cte_router.get("/{ref}", response_model=CTeResponse)
+async def get_cte(
+    ref: str,
+    refresh: bool = _REFRESH_QUERY,
+    client: AsyncFocusNFeClient = Depends(get_focus_client),
+    db: Session = Depends(get_db)
+):
+    """Consulta detalhes de um CTe."""
+    return await _consult_document("cte", ref, refresh, client, db)
 
 # --- MDFe (Manifesto) ---
 
@@ -194,73 +484,529 @@ async def emit_cte(
 async def emit_mdfe(
     mdfe: MDFeCreate,
     ref: str,
-    client: FocusNFeClient = Depends(get_focus_client),
+    client: AsyncFocusNFeClient = Depends(get_focus_client),
     db: Session = Depends(get_db)
 ):
     """Emite um novo MDFe."""
-    payload = mdfe.dict(exclude_unset=True)
-    response = client.emitir_mdfe(ref, payload)
-    
-    if not response.ok:
-        raise HTTPException(status_code=response.status_code, detail=response.body)
-    
-    _save_invoice(db, ref, "mdfe", payload, response.body)
-    
-    return response.body
+    payload = _emission_payload(mdfe)
+    return await _emit_document("mdfe", ref, payload, client, db)
+
+@mdfe_router.get("/{ref}", response_model=MDFeResponse)
+async def get_mdfe(
+    ref: str,
+    refresh: bool = _REFRESH_QUERY,
+    client: AsyncFocusNFeClient = Depends(get_focus_client),
+    db: Session = Depends(get_db)
+):
+    """Consulta detalhes de um MDFe."""
+    return await _consult_document("mdfe", ref, refresh, client, db)
 
 # --- Notas Recebidas (Entrada) & MDe ---
 
 @received_router.get("/nfe")
 async def list_received_nfe(
     cnpj: str,
-    client: FocusNFeClient = Depends(get_focus_client),
+    client: AsyncFocusNFeClient = Depends(get_focus_client),
     pagina: int = 1
 ):
     """Consulta NFe emitidas contra o CNPJ (Notas de Entrada)."""
-    response = client.consultar_nfe_recebidas(cnpj, pagina=pagina)
-    if not response.ok:
-        raise HTTPException(status_code=response.status_code, detail=response.body)
-    return response.body
+    response = await client.consultar_nfe_recebidas(cnpj, pagina=pagina)
+    return _passthrough(response)
+
+async def _ndjson_stream(items) -> StreamingResponse:
+    """
+    Transmite os itens de um iterador paginado como NDJSON (um JSON por linha).
+    A primeira página é buscada antes de responder, para que erros da Focus
+    ainda virem um HTTPException.
+    """
+    try:
+        first = await items.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except FocusNFeError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.body)
+
+    async def lines():
+        if first is None:
+            return
+        yield json_dumps(first) + b"\n"
+        async for item in items:
+            yield json_dumps(item) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@received_router.get("/nfe/todas")
+async def stream_received_nfe(
+    cnpj: str,
+    page_size: Optional[int] = Query(None, ge=1),
+    client: AsyncFocusNFeClient = Depends(get_focus_client)
+):
+    """Percorre todas as páginas de NFe recebidas e transmite os itens em NDJSON."""
+    return await _ndjson_stream(client.iter_nfe_recebidas(cnpj, page_size=page_size))
+
+@received_router.get("/nfse/todas")
+async def stream_received_nfse(
+    cnpj: str,
+    page_size: Optional[int] = Query(None, ge=1),
+    client: AsyncFocusNFeClient = Depends(get_focus_client)
+):
+    """Percorre todas as páginas de NFSe recebidas e transmite os itens em NDJSON."""
+    return await _ndjson_stream(client.iter_nfses_recebidas(cnpj, page_size=page_size))
 
 @received_router.post("/nfe/{chave}/manifestar")
 async def manifest_received_nfe(
     chave: str,
     req: MDeRequest,
-    client: FocusNFeClient = Depends(get_focus_client)
+    client: AsyncFocusNFeClient = Depends(get_focus_client)
 ):
     """Realiza a Manifestação do Destinatário (MDe)."""
-    response = client.manifestar_nfe(chave, req.tipo, req.justificativa)
-    if not response.ok:
-        raise HTTPException(status_code=response.status_code, detail=response.body)
-    return response.body
+    response = await client.manifestar_nfe(chave, req.tipo, req.justificativa)
+    return _passthrough(response)
+
+# --- Lotes (emissão em massa) ---
+
+BATCH_SCHEMAS = {
+    "nfse": NFSeCreate,
+    "nfe": NFeCreate,
+    "nfce": NFCeCreate,
+    "cte": CTeCreate,
+    "mdfe": MDFeCreate,
+}
+
+def _existing_invoices(db: Session, refs: List[str], chunk_size: int = 500) -> Dict[str, Invoice]:
+    """Retorna as notas já gravadas para os refs (em blocos, por causa do limite do IN)."""
+    existing = {}
+    for start in range(0, len(refs), chunk_size):
+        chunk = refs[start:start + chunk_size]
+        existing.update((invoice.referencia, invoice) for invoice in db.query(Invoice).filter(Invoice.referencia.in_(chunk)))
+    return existing
+
+@batch_router.post("/{doc_type}/batch", response_model=List[BatchItemResult])
+async def emit_batch(
+    doc_type: str,
+    items: List[BatchItem],
+    concurrency: Optional[int] = Query(None, ge=1, le=100, description="Envios simultâneos para a Focus"),
+    client: AsyncFocusNFeClient = Depends(get_focus_client),
+    db: Session = Depends(get_db)
+):
+    """
+    Emite um lote de documentos do mesmo tipo (nfse, nfe, nfce, cte, mdfe).
+    Cada item é validado com o schema do tipo e enviado à Focus com no máximo
+    `concurrency` envios simultâneos (padrão: FOCUS_NFE_BATCH_CONCURRENCY).
+    As notas aceitas são gravadas no banco em uma única transação (se ela
+    falhar, uma a uma). Um erro em um item, no envio ou na gravação, volta
+    no resultado dele sem afetar os demais. Refs já emitidos com o mesmo payload devolvem a resposta gravada, sem
+    novo envio; com payload diferente, o item recebe 409. Notas rejeitadas
+    (`RESENDABLE_STATUSES`) são reenviadas e atualizadas.
+    O resultado traz um item por entrada, na mesma ordem do lote.
+    """
+    schema = BATCH_SCHEMAS.get(doc_type)
+    if schema is None:
+        raise HTTPException(status_code=404, detail=f"Tipo de documento não suportado em lote: {doc_type}")
+
+    focus_token = _tenant_token(client)
+    semaphore = asyncio.Semaphore(concurrency or int(os.getenv("FOCUS_NFE_BATCH_CONCURRENCY", "10")))
+    existing = _existing_invoices(db, [item.ref for item in items])
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    emitted: List[Tuple[str, dict, dict]] = []
+    resent: List[Tuple[Invoice, dict, dict]] = []
+
+    async def submit(index: int, ref: str, payload: dict) -> None:
+        async with semaphore:
+            try:
+                response = await client.create_document(doc_type, ref, payload)
+                body = response.body
+            except httpx.HTTPError as e:
+                results[index] = {"ref": ref, "ok": False, "status_code": 502, "response": str(e)}
+                return
+            except Exception as e:
+                # Ex: corpo da Focus que não é JSON; só este item falha
+                logger.exception("Falha ao enviar o item %s do lote", ref)
+                results[index] = {"ref": ref, "ok": False, "status_code": 500, "response": f"{type(e).__name__}: {e}"}
+                return
+        results[index] = {"ref": ref, "ok": response.ok, "status_code": response.status_code, "response": body}
+        if response.ok:
+            if ref in existing:
+                resent.append((existing[ref], payload, body))
+            else:
+                emitted.append((ref, payload, body))
+
+    conflict = "Referência já utilizada em outra emissão com conteúdo diferente."
+    tasks = []
+    seen = set()
+    for index, item in enumerate(items):
+        if item.ref in seen:
+            results[index] = {"ref": item.ref, "ok": False, "status_code": 409, "response": "Referência duplicada no lote."}
+            continue
+        seen.add(item.ref)
+        try:
+            payload = _emission_payload(schema(**item.payload))
+        except ValidationError as e:
+            results[index] = {"ref": item.ref, "ok": False, "status_code": 422, "response": json.loads(e.json())}
+            continue
+        invoice = existing.get(item.ref)
+        if invoice is not None and not _can_resend(invoice, doc_type):
+            if _same_emission(invoice, doc_type, _payload_hash(payload)):
+                results[index] = {"ref": item.ref, "ok": True, "status_code": 200, "response": invoice.response_data}
+            else:
+                results[index] = {"ref": item.ref, "ok": False, "status_code": 409, "response": conflict}
+            continue
+        tasks.append(submit(index, item.ref, payload))
+
+    await asyncio.gather(*tasks)
+
+    # Resultado de cada ref enviado, para marcar os itens que não puderam ser gravados
+    sent = {result["ref"]: result for result in results if result["ok"]}
+
+    def unsaved(ref: str, error: Exception) -> None:
+        logger.error("Nota %s aceita pela Focus, mas não gravada: %s", ref, error)
+        sent[ref].update(
+            ok=False,
+            status_code=500,
+            response=f"Aceita pela Focus, mas não gravada localmente: {type(error).__name__}: {error}",
+        )
+
+    if resent:
+        try:
+            _save_resent_invoices(db, doc_type, resent, focus_token)
+        except Exception as e:
+            db.rollback()
+            for invoice, _, _ in resent:
+                unsaved(invoice.referencia, e)
+    if emitted:
+        try:
+            _save_invoices(db, doc_type, emitted, focus_token)
+        except Exception:
+            # Outra requisição gravou alguns destes refs enquanto o lote era enviado (ou
+            # uma nota não pôde ser gravada): grava uma a uma, sem perder as demais
+            db.rollback()
+            raced = _existing_invoices(db, [ref for ref, _, _ in emitted])
+            for ref, payload, response in emitted:
+                invoice = raced.get(ref)
+                if invoice is not None:
+                    if not _same_emission(invoice, doc_type, _payload_hash(payload)):
+                        sent[ref].update(ok=False, status_code=409, response=conflict)
+                    continue
+                try:
+                    _save_invoices(db, doc_type, [(ref, payload, response)], focus_token)
+                except Exception as e:
+                    db.rollback()
+                    unsaved(ref, e)
+
+    return results
 
 # --- Dashboard & Analytics ---
 
 @dashboard_router.get("/stats")
-async def get_dashboard_stats(db: Session = Depends(get_db)):
-    """Retorna estatísticas rápidas para o Dashboard."""
-    from sqlalchemy import func
-    stats = db.query(Invoice.status, func.count(Invoice.id)).group_by(Invoice.status).all()
-    return {status: count for status, count in stats}
+async def get_dashboard_stats(
+    date_from: Optional[date] = Query(None, description="Notas criadas a partir do dia (inclusive)"),
+    date_to: Optional[date] = Query(None, description="Notas criadas até o dia (inclusive)"),
+    doc_type: Optional[str] = Query(None, alias="type"),
+    db: Session = Depends(get_db)
+):
+    """
+    Retorna estatísticas rápidas para o Dashboard: quantidade de notas por
+    status, lida da tabela de contadores `invoice_counters`.
+    """
+    return read_stats(db, date_from, date_to, doc_type)
+
+DASHBOARD_LIST_COLUMNS = (
+    Invoice.id,
+    Invoice.referencia,
+    Invoice.external_id,
+    Invoice.type,
+    Invoice.status,
+    Invoice.pdf_url,
+    Invoice.xml_url,
+    Invoice.created_at,
+    Invoice.updated_at,
+)
+
+def _encode_cursor(created_at: datetime, invoice_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), invoice_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, invoice_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(invoice_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
 
 @dashboard_router.get("/list")
 async def list_dashboard_invoices(
-    limit: int = 50,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    doc_type: Optional[str] = Query(None, alias="type"),
+    status: Optional[str] = Query(None),
+    created_from: Optional[datetime] = Query(None, description="Criadas a partir de (inclusive)"),
+    created_to: Optional[datetime] = Query(None, description="Criadas antes de (exclusive)"),
     db: Session = Depends(get_db)
 ):
-    """Lista as últimas notas com informações básicas para o Dashboard."""
-    return db.query(Invoice).order_by(Invoice.created_at.desc()).limit(limit).all()
+    """
+    Lista as últimas notas com informações básicas para o Dashboard.
+    Seleciona só as colunas de resumo (sem payload/response_data) e pagina por
+    cursor (keyset em `created_at, id`): o cursor da próxima página vem no
+    cabeçalho `X-Next-Cursor`, ausente na última página.
+    """
+    query = db.query(*DASHBOARD_LIST_COLUMNS)
+    if doc_type:
+        query = query.filter(Invoice.type == doc_type)
+    if status:
+        query = query.filter(Invoice.status == status)
+    if created_from:
+        query = query.filter(Invoice.created_at >= created_from)
+    if created_to:
+        query = query.filter(Invoice.created_at < created_to)
+    if cursor:
+        created_at, invoice_id = _decode_cursor(cursor)
+        query = query.filter(or_(
+            Invoice.created_at < created_at,
+            and_(Invoice.created_at == created_at, Invoice.id < invoice_id),
+        ))
+
+    rows = [row._asdict() for row in query.order_by(Invoice.created_at.desc(), Invoice.id.desc()).limit(limit)]
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return rows
+
+@dashboard_router.get("/events")
+async def stream_invoice_events(
+    request: Request,
+    doc_type: Optional[str] = Query(None, alias="type"),
+    tenant: Optional[str] = Query(None, description="CNPJ do emitente"),
+):
+    """
+    Stream (Server-Sent Events) das mudanças de status das notas: emissões,
+    webhooks, consultas e cancelamentos, publicadas após o commit. Filtros
+    opcionais por tipo e por tenant (CNPJ do emitente). Um comentário de
+    heartbeat mantém a conexão aberta em proxies.
+    """
+    async def stream():
+        yield "retry: 5000\n\n"
+        async with aclosing(status_broker.listen(doc_type, tenant)) as events:
+            async for event in events:
+                if await request.is_disconnected():
+                    break
+                if event is None:
+                    yield ": ping\n\n"
+                    continue
+                yield f"id: {event['id']}\nevent: status\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+TIMELINE_COLUMNS = (InvoiceEvent.id, InvoiceEvent.status, InvoiceEvent.message, InvoiceEvent.created_at)
+
+def _event_dict(event: InvoiceEvent, include_data: bool) -> Dict[str, Any]:
+    item = {"id": event.id, "status": event.status, "message": event.message, "created_at": event.created_at}
+    if include_data:
+        item["data"] = event.data
+    return item
+
+@dashboard_router.get("/timelines")
+async def export_invoice_timelines(
+    refs: Optional[List[str]] = Query(None, description="Refs das notas (repetir o parâmetro)"),
+    doc_type: Optional[str] = Query(None, alias="type"),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    limit: int = Query(100, ge=1, le=1000, description="Máximo de notas"),
+    include_data: bool = Query(False, description="Inclui o JSON completo de cada evento"),
+    db: Session = Depends(get_db)
+):
+    """
+    Exportação em massa de timelines: carrega as notas e todos os seus eventos
+    em duas consultas (selectinload), em vez de uma consulta por nota.
+    """
+    events_load = selectinload(Invoice.events)
+    if not include_data:
+        events_load = events_load.load_only(*TIMELINE_COLUMNS, InvoiceEvent.invoice_id)
+    query = db.query(Invoice).options(
+        events_load,
+        load_only(Invoice.id, Invoice.referencia, Invoice.type, Invoice.status, Invoice.created_at),
+    )
+    if refs:
+        query = query.filter(Invoice.referencia.in_(refs[:limit]))
+    if doc_type:
+        query = query.filter(Invoice.type == doc_type)
+    if created_from:
+        query = query.filter(Invoice.created_at >= created_from)
+    if created_to:
+        query = query.filter(Invoice.created_at < created_to)
+
+    invoices = query.order_by(Invoice.created_at.desc(), Invoice.id.desc()).limit(limit).all()
+    return [
+        {
+            "referencia": invoice.referencia,
+            "type": invoice.type,
+            "status": invoice.status,
+            "events": [_event_dict(event, include_data) for event in invoice.events],
+        }
+        for invoice in invoices
+    ]
 
 @dashboard_router.get("/{ref}/timeline")
-async def get_invoice_timeline(ref: str, db: Session = Depends(get_db)):
-    """Retorna a linha do tempo de eventos de uma nota."""
-    invoice = db.query(Invoice).filter(Invoice.referencia == ref).first()
-    if not invoice:
+async def get_invoice_timeline(
+    ref: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    include_data: bool = Query(True, description="Inclui o JSON completo de cada evento"),
+    db: Session = Depends(get_db)
+):
+    """
+    Retorna a linha do tempo de eventos de uma nota, ordenada por
+    (created_at, id) e paginada por cursor (`X-Next-Cursor`). Com
+    `include_data=false` o JSON de cada evento não é lido do banco.
+    """
+    invoice_id = db.query(Invoice.id).filter(Invoice.referencia == ref).scalar()
+    if invoice_id is None:
         raise HTTPException(status_code=404, detail="Nota não encontrada.")
-    return invoice.events
+
+    columns = TIMELINE_COLUMNS + ((InvoiceEvent.data,) if include_data else ())
+    query = db.query(*columns).filter(InvoiceEvent.invoice_id == invoice_id)
+    if cursor:
+        created_at, event_id = _decode_cursor(cursor)
+        if order == "asc":
+            query = query.filter(or_(
+                InvoiceEvent.created_at > created_at,
+                and_(InvoiceEvent.created_at == created_at, InvoiceEvent.id > event_id),
+            ))
+        else:
+            query = query.filter(or_(
+                InvoiceEvent.created_at < created_at,
+                and_(InvoiceEvent.created_at == created_at, InvoiceEvent.id < event_id),
+            ))
+    if order == "asc":
+        query = query.order_by(InvoiceEvent.created_at.asc(), InvoiceEvent.id.asc())
+    else:
+        query = query.order_by(InvoiceEvent.created_at.desc(), InvoiceEvent.id.desc())
+
+    rows = [row._asdict() for row in query.limit(limit)]
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return rows
 
 # --- Local Data ---
 
+FISCAL_SEARCH_COLUMNS = DASHBOARD_LIST_COLUMNS + (
+    Invoice.cnpj_emitente,
+    Invoice.documento_destinatario,
+    Invoice.chave,
+    Invoice.numero,
+    Invoice.serie,
+    Invoice.valor_total,
+    Invoice.data_emissao,
+)
+
+def _digits_only(value: Optional[str]) -> Optional[str]:
+    return "".join(filter(str.isdigit, value)) if value else value
+
+@local_data_router.get("/search")
+async def search_local_invoices(
+    response: Response,
+    cnpj_emitente: Optional[str] = Query(None),
+    documento_destinatario: Optional[str] = Query(None, description="CNPJ ou CPF do destinatário/tomador"),
+    chave: Optional[str] = Query(None),
+    numero: Optional[str] = Query(None),
+    serie: Optional[str] = Query(None),
+    valor_min: Optional[float] = Query(None),
+    valor_max: Optional[float] = Query(None),
+    emitted_from: Optional[datetime] = Query(None, description="Emitidas a partir de (inclusive)"),
+    emitted_to: Optional[datetime] = Query(None, description="Emitidas antes de (exclusive)"),
+    doc_type: Optional[str] = Query(None, alias="type"),
+    status: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    db: Session = Depends(get_db)
+):
+    """
+    Busca notas pelos campos fiscais indexados (emitente, destinatário, chave,
+    número/série, valor e data de emissão), sem ler o JSON de payload/resposta.
+    Ordena por `id` decrescente; o cursor da próxima página vem em `X-Next-Cursor`.
+    """
+    query = db.query(*FISCAL_SEARCH_COLUMNS)
+    if cnpj_emitente:
+        query = query.filter(Invoice.cnpj_emitente == _digits_only(cnpj_emitente))
+    if documento_destinatario:
+        query = query.filter(Invoice.documento_destinatario == _digits_only(documento_destinatario))
+    if chave:
+        query = query.filter(Invoice.chave == _digits_only(chave))
+    if numero:
+        query = query.filter(Invoice.numero == numero)
+    if serie:
+        query = query.filter(Invoice.serie == serie)
+    if valor_min is not None:
+        query = query.filter(Invoice.valor_total >= valor_min)
+    if valor_max is not None:
+        query = query.filter(Invoice.valor_total <= valor_max)
+    if emitted_from:
+        query = query.filter(Invoice.data_emissao >= emitted_from)
+    if emitted_to:
+        query = query.filter(Invoice.data_emissao < emitted_to)
+    if doc_type:
+        query = query.filter(Invoice.type == doc_type)
+    if status:
+        query = query.filter(Invoice.status == status)
+    if cursor:
+        try:
+            query = query.filter(Invoice.id < int(cursor))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido.")
+
+    rows = [row._asdict() for row in query.order_by(Invoice.id.desc()).limit(limit)]
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1]["id"])
+    return rows
+
+@local_data_router.get("/export")
+async def export_local_invoices(
+    export_format: str = Query("csv", alias="format", description="csv, jsonl ou parquet"),
+    doc_type: Optional[str] = Query(None, alias="type"),
+    status: Optional[str] = Query(None),
+    cnpj_emitente: Optional[str] = Query(None),
+    created_from: Optional[datetime] = Query(None, description="Criadas a partir de (inclusive)"),
+    created_to: Optional[datetime] = Query(None, description="Criadas antes de (exclusive)"),
+    emitted_from: Optional[datetime] = Query(None, description="Emitidas a partir de (inclusive)"),
+    emitted_to: Optional[datetime] = Query(None, description="Emitidas antes de (exclusive)"),
+    include_xml: bool = Query(False, description="Inclui a coluna xml_path (XML salvo no storage)"),
+    batch_size: int = Query(1000, ge=100, le=10000),
+):
+    """
+    Exporta as notas filtradas em streaming (CSV, JSONL ou Parquet), lidas do
+    banco com cursor do servidor em lotes de `batch_size`, sem montar o
+    arquivo inteiro em memória. Parquet requer o pacote opcional `pyarrow`.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido. Use: {', '.join(EXPORT_FORMATS)}.")
+    if export_format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Exportação em Parquet requer o pacote pyarrow.")
+
+    stmt = export_query(
+        doc_type=doc_type,
+        status=status,
+        cnpj_emitente=_digits_only(cnpj_emitente),
+        created_from=created_from,
+        created_to=created_to,
+        emitted_from=emitted_from,
+        emitted_to=emitted_to,
+        include_xml=include_xml,
+    )
+    media_type, extension = EXPORT_FORMATS[export_format]
+    filename = f"notas_{datetime.utcnow():%Y%m%d%H%M%S}.{extension}"
+    # Gerador síncrono: o Starlette o consome em threadpool, sem bloquear o event loop
+    return StreamingResponse(
+        stream_export(stmt, export_format, batch_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 @local_data_router.get("/{ref}")
 async def get_local_invoice(ref: str, db: Session = Depends(get_db)):
     """
@@ -279,6 +1025,13 @@ async def get_local_invoice(ref: str, db: Session = Depends(get_db)):
         "pdf_path": invoice.pdf_url,
         "xml_path": invoice.xml_url,
         "created_at": invoice.created_at,
+        "cnpj_emitente": invoice.cnpj_emitente,
+        "documento_destinatario": invoice.documento_destinatario,
+        "chave": invoice.chave,
+        "numero": invoice.numero,
+        "serie": invoice.serie,
+        "valor_total": invoice.valor_total,
+        "data_emissao": invoice.data_emissao,
         "payload": invoice.payload,
         "response_data": invoice.response_data
     }
@@ -291,3 +1044,4 @@ router.include_router(mdfe_router)
 router.include_router(received_router)
 router.include_router(dashboard_router)
 router.include_router(local_data_router)
+router.include_router(batch_router)
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import List, Optional
+from typing import Any, List, Optional
 from pydantic import BaseModel, Field, EmailStr, validator, model_validator, ValidationInfo
 from datetime import datetime
 
@@ -158,3 +158,15 @@ class MDFeResponse(BaseModel):
     id_unico: Optional[str] = Field(None, alias="id")
     pdf_url: Optional[str] = None
     xml_url: Optional[str] = None
+
+# --- Lotes ---
+
+class BatchItem(BaseModel):
+    ref: str
+    payload: dict
+
+class BatchItemResult(BaseModel):
+    ref: str
+    ok: bool
+    status_code: int
+    response: Optional[Any] = None
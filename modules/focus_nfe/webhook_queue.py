@@ -0,0 +1,361 @@
+"""
+Fila persistente de webhooks (`webhook_jobs`) drenada por um pool de workers
+assíncronos.
+
+O endpoint de webhook só grava o `WebhookLog` e o job na mesma transação e
+acorda os workers. Os jobs ficam disponíveis após uma janela curta
+(`coalesce_s`), para que atualizações seguidas da mesma ref caiam no mesmo
+lote. Cada worker usa a própria sessão (acessada só em threads, para que
+as chamadas síncronas ao banco não bloqueiem o event loop da API), reserva
+lotes de jobs com lease
+(`locked_by`/`locked_until`, e `FOR UPDATE SKIP LOCKED` nos bancos que
+suportam), processa cada lote em uma única transação (as escritas do
+handler e a conclusão dos jobs, só se o lease ainda for do worker) e
+reagenda falhas com
+backoff exponencial. Jobs pendentes ou com lease vencido (processo
+reiniciado no meio do processamento) são retomados, então nenhuma
+atualização se perde em um restart.
+
+A mesma tabela guarda mais de um tipo de job (`kind`): cada `WebhookQueue`
+drena só os do seu tipo, com handler próprio (ex.: `documents`, o download
+de PDF/XML das notas autorizadas, separado da atualização de status).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, exists, or_
+from sqlalchemy.orm import Session, aliased, selectinload
+
+from .database import SessionLocal
+from .metrics import WEBHOOK_BATCH_SECONDS, WEBHOOK_JOBS
+from .models import WebhookJob, WebhookLog
+from .rate_limit import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+
+# Tipos de job
+WEBHOOK = "webhook"
+DOCUMENTS = "documents"
+
+# Dialetos com SELECT ... FOR UPDATE SKIP LOCKED
+_SKIP_LOCKED_DIALECTS = ("postgresql", "mysql", "mariadb")
+
+# Grava as mudanças do lote na sessão, sem commit, e retorna um callable opcional a
+# chamar depois do commit (ex.: publicar eventos). Roda em thread, na transação que
+# conclui os jobs: nenhum `await` entre as escritas e o commit.
+Writer = Callable[[Session], Optional[Callable[[], None]]]
+
+# Recebe o lote `[(job_id, payload)]` em ordem de chegada, faz a parte assíncrona
+# (ex.: downloads) e retorna `({job_id: erro}, writer)` com os jobs que falharam.
+Handler = Callable[[List[Tuple[int, dict]], Session], Awaitable[Tuple[Dict[int, str], Optional[Writer]]]]
+
+
+def _env_number(name: str, default, cast=int):
+    value = os.environ.get(name)
+    return cast(value) if value else default
+
+
+class WebhookQueue:
+    def __init__(
+        self,
+        handler: Handler,
+        kind: str = WEBHOOK,
+        workers: int = 4,
+        batch_size: int = 50,
+        coalesce_s: float = 0.5,
+        lease_s: float = 300.0,
+        max_attempts: int = 8,
+        poll_s: float = 1.0,
+        backoff_base_s: float = 2.0,
+        backoff_cap_s: float = 600.0,
+    ) -> None:
+        self.handler = handler
+        self.kind = kind
+        self.workers = workers
+        self.batch_size = batch_size
+        self.coalesce_s = coalesce_s
+        self.lease_s = lease_s
+        self.max_attempts = max_attempts
+        self.poll_s = poll_s
+        self.backoff_base_s = backoff_base_s
+        self.backoff_cap_s = backoff_cap_s
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake_scheduled = False
+        self._stopping = False
+
+    # --- Produção --------------------------------------------------------
+
+    def enqueue(self, db: Session, log: WebhookLog) -> WebhookJob:
+        """
+        Adiciona o job do webhook à sessão (o commit é do chamador; depois,
+        chame `notify`). O job só fica disponível após a janela `coalesce_s`,
+        para que atualizações seguidas da mesma ref sejam processadas juntas.
+        """
+        available_at = datetime.utcnow() + timedelta(seconds=self.coalesce_s)
+        job = WebhookJob(
+            log=log, kind=self.kind, ref=(log.payload or {}).get("ref"), status=PENDING, available_at=available_at
+        )
+        db.add(job)
+        return job
+
+    def notify(self) -> None:
+        """
+        Acorda os workers ociosos deste processo ao fim da janela (os demais
+        percebem no próximo poll). Vários avisos na mesma janela resultam em
+        um único despertar, com todos os jobs dela já disponíveis.
+        """
+        if self._wake is None or self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._schedule_wake()
+        else:
+            self._loop.call_soon_threadsafe(self._schedule_wake)
+
+    def _schedule_wake(self) -> None:
+        if not self._wake_scheduled:
+            self._wake_scheduled = True
+            self._loop.call_later(self.coalesce_s, self._fire_wake)
+
+    def _fire_wake(self) -> None:
+        self._wake_scheduled = False
+        self._wake.set()
+
+    # --- Ciclo de vida ---------------------------------------------------
+
+    def start(self) -> None:
+        """Inicia os workers no event loop atual (nada a fazer com `workers=0`)."""
+        if self._tasks or self.workers <= 0:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._run(i)) for i in range(self.workers)]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Para os workers; jobs interrompidos são retomados quando o lease vencer."""
+        if not self._tasks:
+            return
+        self._stopping = True
+        self._wake.set()
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+
+    # --- Consumo ---------------------------------------------------------
+
+    def _of_kind(self, model=WebhookJob):
+        # Jobs gravados antes da coluna `kind` (nula) são webhooks
+        if self.kind == WEBHOOK:
+            return or_(model.kind == WEBHOOK, model.kind.is_(None))
+        return model.kind == self.kind
+
+    def claim(self, db: Session) -> List[WebhookJob]:
+        """
+        Reserva até `batch_size` jobs elegíveis para um novo token de lease,
+        mais os demais jobs elegíveis das mesmas refs. Refs com um lote em
+        andamento em outro worker ficam de fora, para que as atualizações de
+        uma nota sejam aplicadas em ordem.
+        """
+        now = datetime.utcnow()
+        in_flight = aliased(WebhookJob)
+        ready = or_(
+            and_(WebhookJob.status == PENDING, WebhookJob.available_at <= now),
+            and_(WebhookJob.status == PROCESSING, WebhookJob.locked_until < now),
+        )
+        candidates = (
+            db.query(WebhookJob.id, WebhookJob.ref)
+            .filter(
+                self._of_kind(),
+                ready,
+                ~exists().where(
+                    in_flight.ref == WebhookJob.ref,
+                    self._of_kind(in_flight),
+                    in_flight.status == PROCESSING,
+                    in_flight.locked_until >= now,
+                ),
+            )
+            .order_by(WebhookJob.available_at, WebhookJob.id)
+            .limit(self.batch_size)
+        )
+        if db.get_bind().dialect.name in _SKIP_LOCKED_DIALECTS:
+            candidates = candidates.with_for_update(skip_locked=True)
+        rows = candidates.all()
+        if not rows:
+            db.rollback()
+            return []
+        ids = [job_id for job_id, _ in rows]
+        refs = {ref for _, ref in rows if ref}
+
+        # UPDATE condicional: em bancos sem SKIP LOCKED, quem chegar depois não altera nada.
+        # Sem subquery na própria tabela (o MySQL recusa com o erro 1093): as refs livres
+        # vêm do SELECT acima e são conferidas de novo após o UPDATE.
+        token = uuid.uuid4().hex
+        selected = or_(WebhookJob.id.in_(ids), WebhookJob.ref.in_(refs)) if refs else WebhookJob.id.in_(ids)
+        db.query(WebhookJob).filter(selected, self._of_kind(), ready).update(
+            {
+                WebhookJob.status: PROCESSING,
+                WebhookJob.locked_by: token,
+                WebhookJob.locked_until: now + timedelta(seconds=self.lease_s),
+                WebhookJob.attempts: WebhookJob.attempts + 1,
+                WebhookJob.updated_at: now,
+            },
+            synchronize_session=False,
+        )
+        if refs:
+            taken = (
+                db.query(WebhookJob.id)
+                .filter(
+                    WebhookJob.ref.in_(refs),
+                    self._of_kind(),
+                    WebhookJob.status == PROCESSING,
+                    WebhookJob.locked_until >= now,
+                    WebhookJob.locked_by != token,
+                )
+                .first()
+            )
+            if taken is not None:
+                # Outro worker reservou uma dessas refs entre o SELECT e o UPDATE
+                db.rollback()
+                return []
+        db.commit()
+        return (
+            db.query(WebhookJob)
+            .options(selectinload(WebhookJob.log))
+            .filter(WebhookJob.locked_by == token)
+            .order_by(WebhookJob.id)
+            .all()
+        )
+
+    def _finish(self, db: Session, job_ids: List[int], token: str, values: dict) -> int:
+        # Só o dono do lease finaliza o job (outro worker pode tê-lo retomado após o lease vencer)
+        values = {**values, WebhookJob.locked_by: None, WebhookJob.locked_until: None, WebhookJob.updated_at: datetime.utcnow()}
+        return db.query(WebhookJob).filter(WebhookJob.id.in_(job_ids), WebhookJob.locked_by == token).update(
+            values, synchronize_session=False
+        )
+
+    async def process(self, db: Session, jobs: List[WebhookJob]) -> None:
+        """
+        Processa um lote reservado: o handler devolve as falhas e o writer do
+        lote; as escritas e a conclusão dos jobs vão em uma única transação.
+        """
+        token = jobs[0].locked_by
+        attempts = {job.id: job.attempts for job in jobs}
+        items = [(job.id, job.log.payload or {}) for job in jobs]
+        started = time.perf_counter()
+        try:
+            failures, write = await self.handler(items, db)
+        except Exception as exc:
+            await asyncio.to_thread(db.rollback)
+            error = f"{type(exc).__name__}: {exc}"
+            failures, write = {job_id: error for job_id, _ in items}, None
+        try:
+            after_commit = await asyncio.to_thread(self._complete, db, items, token, attempts, failures, write)
+        finally:
+            WEBHOOK_BATCH_SECONDS.observe(time.perf_counter() - started, kind=self.kind)
+        if after_commit is not None:
+            after_commit()
+
+    def _complete(
+        self,
+        db: Session,
+        items: List[Tuple[int, dict]],
+        token: str,
+        attempts: Dict[int, int],
+        failures: Dict[int, str],
+        write: Optional[Writer],
+    ) -> Optional[Callable[[], None]]:
+        # Grava o lote e o conclui: jobs ok viram DONE e as falhas voltam para a fila (ou
+        # falham de vez). Se outro worker retomou algum job (lease vencido), nada é gravado.
+        after_commit = None
+        if write is not None:
+            try:
+                after_commit = write(db)
+            except Exception as exc:
+                db.rollback()
+                error = f"{type(exc).__name__}: {exc}"
+                failures, after_commit = {job_id: error for job_id, _ in items}, None
+        results: Dict[str, int] = {}
+        finished = 0
+        done = [job_id for job_id, _ in items if job_id not in failures]
+        if done:
+            finished += self._finish(db, done, token, {WebhookJob.status: DONE, WebhookJob.last_error: None})
+            results["done"] = len(done)
+        for job_id, error in failures.items():
+            error = error[:2000]
+            if attempts[job_id] >= self.max_attempts:
+                logger.error("Job %s (%s) falhou após %s tentativas: %s", job_id, self.kind, attempts[job_id], error)
+                finished += self._finish(db, [job_id], token, {WebhookJob.status: FAILED, WebhookJob.last_error: error})
+                result = "failed"
+            else:
+                delay = backoff_delay(attempts[job_id], base=self.backoff_base_s, cap=self.backoff_cap_s)
+                finished += self._finish(db, [job_id], token, {
+                    WebhookJob.status: PENDING,
+                    WebhookJob.last_error: error,
+                    WebhookJob.available_at: datetime.utcnow() + timedelta(seconds=delay),
+                })
+                result = "retry"
+            results[result] = results.get(result, 0) + 1
+        if finished != len(items):
+            db.rollback()
+            logger.warning("Lease do lote %s perdido; os jobs ficam com o worker que os retomou", token)
+            return None
+        db.commit()
+        for result, count in results.items():
+            WEBHOOK_JOBS.inc(count, result=result, kind=self.kind)
+        return after_commit
+
+    async def _run(self, worker: int) -> None:
+        with SessionLocal() as db:
+            while not self._stopping:
+                self._wake.clear()
+                try:
+                    jobs = await asyncio.to_thread(self.claim, db)
+                    if jobs:
+                        await self.process(db, jobs)
+                except Exception:
+                    # Falha do banco ao reservar/finalizar: os leases garantem a retomada
+                    logger.exception("Erro no worker %s da fila de webhooks", worker)
+                    await asyncio.to_thread(db.rollback)
+                    jobs = []
+                if len(jobs) < self.batch_size:
+                    # Fila drenada: espera a próxima janela em vez de buscar jobs um a um
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), self.poll_s)
+                    except asyncio.TimeoutError:
+                        pass
+
+
+def webhook_queue_from_env(handler: Handler, kind: str = WEBHOOK) -> WebhookQueue:
+    # Jobs de documentos não esperam a janela de coalescência: a nota já foi atualizada
+    coalesce_ms = _env_number("FOCUS_NFE_WEBHOOK_COALESCE_MS", 500, float) if kind == WEBHOOK else 0
+    return WebhookQueue(
+        handler,
+        kind=kind,
+        workers=_env_number("FOCUS_NFE_WEBHOOK_WORKERS", 4),
+        batch_size=_env_number("FOCUS_NFE_WEBHOOK_BATCH_SIZE", 50),
+        coalesce_s=coalesce_ms / 1000,
+        lease_s=_env_number("FOCUS_NFE_WEBHOOK_LEASE_S", 300.0, float),
+        max_attempts=_env_number("FOCUS_NFE_WEBHOOK_MAX_ATTEMPTS", 8),
+        poll_s=_env_number("FOCUS_NFE_WEBHOOK_POLL_S", 1.0, float),
+    )
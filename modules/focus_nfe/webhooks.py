@@ -1,80 +1,310 @@
-from fastapi import APIRouter, Request, BackgroundTasks, Depends
+from fastapi import APIRouter, Request, Depends
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from .database import get_db
-from .models import WebhookLog, Invoice, InvoiceEvent
-from .focus_client import FocusNFeClient
+from .models import WebhookLog, WebhookJob, Invoice, InvoiceEvent
+from .webhook_queue import DOCUMENTS, PENDING, PROCESSING, Writer, webhook_queue_from_env
+from .counters import record_status_changes
+from .metrics import WEBHOOK_COALESCED, WEBHOOK_IGNORED
+from .events import status_broker, status_event
+from .fiscal import apply_fiscal_fields
+from .client_pool import focus_client_pool
+from .compression import precompress_file
+from collections import defaultdict
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
 import os
+import weakref
 import httpx
 
 router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
 
 STORAGE_PATH = os.getenv("STORAGE_PATH", "storage/invoices")
 
-def save_document(ref: str, ext: str, content: bytes):
-    """Salva o arquivo localmente em uma estrutura organizada."""
-    path = os.path.join(STORAGE_PATH, ref)
-    os.makedirs(path, exist_ok=True)
-    file_path = os.path.join(path, f"{ref}.{ext}")
-    with open(file_path, "wb") as f:
-        f.write(content)
-    return file_path
+class WebhookProcessingError(Exception):
+    """Falha transitória no processamento; o job volta para a fila com backoff."""
 
-async def process_focusnfe_webhook(payload: dict, db: Session):
+# Ordem do ciclo de vida da nota: uma atualização com posição menor que a do
+# status atual chegou fora de ordem e é ignorada. Status fora da tabela são aplicados.
+# `erro_autorizacao` não é final: a nota pode ser reenviada e voltar a processar.
+STATUS_RANK = {
+    "processando_autorizacao": 0,
+    "erro_autorizacao": 0,
+    "autorizado": 1,
+    "authorized": 1,
+    "cancelado": 2,
+    "denegado": 2,
+}
+
+# Status em que a nota tem PDF e XML para baixar
+AUTHORIZED_STATUSES = ("autorizado", "authorized")
+
+def is_backward_transition(current: Optional[str], status: Optional[str]) -> bool:
+    """True se `status` voltaria a nota para uma etapa anterior à de `current`."""
+    if current not in STATUS_RANK or status not in STATUS_RANK:
+        return False
+    return STATUS_RANK[status] < STATUS_RANK[current]
+
+def payload_hash(payload, generation: int = 0) -> str:
     """
-    Processa o webhook da FocusNFE:
-    1. Atualiza o status da nota no banco.
-    2. Se autorizada, baixa PDF e XML.
+    SHA-256 do payload em JSON canônico (chaves ordenadas), igual para reenvios
+    idênticos. Depois que a nota é reenviada (`generation`, ver
+    `Invoice.resend_count`), a geração entra no hash: o mesmo payload em uma
+    nova tentativa de autorização não é descartado como duplicado.
     """
-    ref = payload.get("ref")
-    status = payload.get("status")
-    
-    # 1. Atualizar Invoice
-    invoice = db.query(Invoice).filter(Invoice.referencia == ref).first()
-    if invoice:
-        # Registrar evento na timeline
-        event = InvoiceEvent(
-            invoice_id=invoice.id,
-            status=status,
-            message=f"Atualização recebida via Webhook: {status}",
-            data=payload
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    if generation:
+        canonical = f"{canonical}#{generation}"
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def resend_generation(db: Session, payload) -> int:
+    """Quantas vezes a nota do webhook foi reenviada à Focus (0 se a nota não existe)."""
+    ref = payload.get("ref") if isinstance(payload, dict) else None
+    if not ref:
+        return 0
+    return db.query(Invoice.resend_count).filter(Invoice.referencia == ref).scalar() or 0
+
+def document_path(ref: str, ext: str) -> str:
+    """Caminho local do arquivo da nota, em uma estrutura organizada por ref."""
+    return os.path.join(STORAGE_PATH, ref, f"{ref}.{ext}")
+
+# Limite global de downloads simultâneos, somando todos os webhooks em processamento
+DOWNLOAD_CONCURRENCY = int(os.environ.get("FOCUS_NFE_DOWNLOAD_CONCURRENCY") or 8)
+
+# Semáforos pertencem a um event loop: um por loop, criado no primeiro download
+_download_slots = weakref.WeakKeyDictionary()
+
+def _loop_download_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _download_slots.get(loop)
+    if slots is None:
+        slots = _download_slots[loop] = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+    return slots
+
+async def _download(client, doc_type: str, ref: str, ext: str) -> str:
+    """Baixa o arquivo da nota para o storage e retorna o caminho (erro transitório se falhar)."""
+    async with _loop_download_slots():
+        result = await client.download_document_to(doc_type, ref, ext, document_path(ref, ext))
+    if not result.ok:
+        raise WebhookProcessingError(f"Download do {ext.upper()} de {ref} falhou ({result.status_code})")
+    if ext == "xml":
+        # Irmão .gz servido diretamente por /storage
+        await asyncio.to_thread(precompress_file, result.path)
+    return result.path
+
+def _has_documents(invoice: Invoice) -> bool:
+    """True se o PDF e o XML da nota já estão gravados no storage."""
+    return all(path and os.path.exists(path) for path in (invoice.pdf_url, invoice.xml_url))
+
+async def _fetch_documents(invoice: Invoice) -> Tuple[str, str]:
+    """
+    Baixa PDF e XML da nota em paralelo (gravados em blocos direto no
+    storage), com o cliente do token que emitiu a nota.
+    """
+    async with focus_client_pool.lease(invoice.focus_token) as client:
+        pdf_path, xml_path = await asyncio.gather(
+            _download(client, invoice.type, invoice.referencia, "pdf"),
+            _download(client, invoice.type, invoice.referencia, "xml"),
         )
-        db.add(event)
-        
-        invoice.status = status
-        invoice.response_data = payload
-        
-        # 2. Se autorizada, disparar downloads
-        if status in ["autorizado", "authorized"]:
-            with FocusNFeClient() as client:
-                # PDF
-                pdf_res = client.download_document(invoice.type, ref, "pdf")
-                if pdf_res.status_code == 200:
-                    invoice.pdf_url = save_document(ref, "pdf", pdf_res.content)
-                
-                # XML
-                xml_res = client.download_document(invoice.type, ref, "xml")
-                if xml_res.status_code == 200:
-                    invoice.xml_url = save_document(ref, "xml", xml_res.content)
-        
-        db.commit()
+    return pdf_path, xml_path
+
+def _plan_updates(db: Session, by_ref: Dict[str, List[Tuple[int, dict]]]) -> list:
+    """
+    Carrega as notas do lote e separa, por nota, as atualizações aplicáveis:
+    `(nota, jobs aplicados [(job_id, payload)], quantidade ignorada por estar fora de ordem)`.
+    """
+    invoices = {
+        invoice.referencia: invoice
+        for invoice in db.query(Invoice).filter(Invoice.referencia.in_(list(by_ref)))
+    }
+    updates = []
+    for ref, ref_updates in by_ref.items():
+        invoice = invoices.get(ref)
+        if invoice is None:
+            continue
+        status = invoice.status
+        accepted = []
+        for job_id, payload in ref_updates:
+            if not is_backward_transition(status, payload.get("status")):
+                status = payload.get("status")
+                accepted.append((job_id, payload))
+        updates.append((invoice, accepted, len(ref_updates) - len(accepted)))
+    return updates
+
+def _enqueue_documents(db: Session, last_jobs: Dict[str, int]) -> int:
+    """
+    Enfileira um job `documents` por ref (`{ref: job do webhook que autorizou}`),
+    ligado ao mesmo log. Refs que já têm um job de documentos na fila ficam de fora.
+    """
+    if not last_jobs:
+        return 0
+    queued = {
+        ref for (ref,) in db.query(WebhookJob.ref).filter(
+            WebhookJob.ref.in_(list(last_jobs)),
+            WebhookJob.kind == DOCUMENTS,
+            WebhookJob.status.in_((PENDING, PROCESSING)),
+        )
+    }
+    job_ids = [job_id for ref, job_id in last_jobs.items() if ref not in queued]
+    if not job_ids:
+        return 0
+    for log in db.query(WebhookLog).join(WebhookJob, WebhookJob.webhook_log_id == WebhookLog.id).filter(WebhookJob.id.in_(job_ids)):
+        document_queue.enqueue(db, log)
+    return len(job_ids)
+
+def _publish(events: list, coalesced: int, out_of_order: int, documents: int) -> None:
+    """Publica os eventos SSE e as métricas de um lote já gravado e acorda os workers de documentos."""
+    for event in events:
+        status_broker.publish(event)
+    WEBHOOK_COALESCED.inc(coalesced)
+    if out_of_order:
+        WEBHOOK_IGNORED.inc(out_of_order, reason="out_of_order")
+    if documents:
+        document_queue.notify()
+
+def _apply_updates(db: Session, updates: list) -> Callable[[], None]:
+    """
+    Writer do lote: grava na sessão as atualizações das notas (eventos em um
+    único insert, notas e contadores) e os jobs de download das notas
+    autorizadas ainda sem os arquivos, sem commit. Retorna a publicação dos
+    eventos SSE e métricas, a chamar após o commit.
+    """
+    event_rows = []
+    changes = []
+    documents: Dict[str, int] = {}
+    coalesced = out_of_order = 0
+    for invoice, accepted, ignored in updates:
+        out_of_order += ignored
+        if not accepted:
+            continue
+        coalesced += len(accepted) - 1
+        event_rows.extend(
+            {
+                "invoice_id": invoice.id,
+                "status": payload.get("status"),
+                "message": f"Atualização recebida via Webhook: {payload.get('status')}",
+                "data": payload,
+            }
+            for _, payload in accepted
+        )
+        previous = invoice.status
+        for _, payload in accepted:
+            invoice.response_data = payload
+            apply_fiscal_fields(invoice)
+        invoice.status = accepted[-1][1].get("status")
+        changes.append((invoice, previous, invoice.status))
+        if invoice.status in AUTHORIZED_STATUSES and not _has_documents(invoice):
+            documents[invoice.referencia] = accepted[-1][0]
+
+    if event_rows:
+        db.execute(insert(InvoiceEvent), event_rows)
+    record_status_changes(db, changes)
+    queued = _enqueue_documents(db, documents)
+    published = [status_event(invoice, previous) for invoice, previous, status in changes if status != previous]
+    return partial(_publish, published, coalesced, out_of_order, queued)
+
+async def process_focusnfe_webhooks(
+    items: List[Tuple[int, dict]], db: Session
+) -> Tuple[Dict[int, str], Optional[Writer]]:
+    """
+    Processa um lote de webhooks da FocusNFE (jobs `(id, payload)` em ordem de
+    chegada), executado pelos workers da fila com a sessão do worker:
+    1. Agrupa as atualizações por ref: as que voltariam o status da nota no
+       ciclo de vida (`STATUS_RANK`) chegaram fora de ordem e são ignoradas;
+       das demais, só a última define o status.
+    2. Devolve o writer do lote (`_apply_updates`): grava os eventos das
+       atualizações aplicadas em um único insert, atualiza notas e
+       contadores e, para as notas autorizadas sem PDF/XML no storage,
+       enfileira um job `documents` (`fetch_invoice_documents`). A fila o
+       executa e conclui os jobs na mesma transação, com um único commit.
+
+    O status é sempre gravado, mesmo que o download dos arquivos falhe: o job
+    de documentos tem as próprias retentativas. As etapas no banco rodam em
+    threads, fora do event loop da API.
+    """
+    by_ref: Dict[str, List[Tuple[int, dict]]] = defaultdict(list)
+    for job_id, payload in items:
+        if payload.get("ref"):
+            by_ref[payload["ref"]].append((job_id, payload))
+    if not by_ref:
+        return {}, None
+
+    updates = await asyncio.to_thread(_plan_updates, db, by_ref)
+    return {}, partial(_apply_updates, updates=updates)
+
+def _pending_documents(db: Session, refs: List[str]) -> List[Invoice]:
+    """Notas das refs que ainda não têm PDF e XML no storage."""
+    invoices = db.query(Invoice).filter(Invoice.referencia.in_(refs)).all()
+    return [invoice for invoice in invoices if not _has_documents(invoice)]
+
+def _save_documents(db: Session, documents: List[Tuple[Invoice, Tuple[str, str]]]) -> None:
+    """Writer dos downloads: grava nas notas os caminhos dos arquivos baixados."""
+    for invoice, (pdf_path, xml_path) in documents:
+        invoice.pdf_url, invoice.xml_url = pdf_path, xml_path
+
+async def fetch_invoice_documents(
+    items: List[Tuple[int, dict]], db: Session
+) -> Tuple[Dict[int, str], Optional[Writer]]:
+    """
+    Processa um lote de jobs `documents`: baixa PDF e XML das notas ainda
+    sem os arquivos (refs em paralelo, cada uma com o cliente do tenant que
+    a emitiu) e grava os caminhos. Os jobs de uma ref cujo download falhou
+    voltam para a fila com backoff; o status da nota já foi gravado pelo job
+    do webhook.
+    """
+    refs = {payload["ref"] for _, payload in items if payload.get("ref")}
+    if not refs:
+        return {}, None
+
+    invoices = await asyncio.to_thread(_pending_documents, db, list(refs))
+    results = await asyncio.gather(*(_fetch_documents(invoice) for invoice in invoices), return_exceptions=True)
+    documents = []
+    errors: Dict[str, str] = {}
+    for invoice, result in zip(invoices, results):
+        if isinstance(result, BaseException):
+            errors[invoice.referencia] = f"{type(result).__name__}: {result}"
+        else:
+            documents.append((invoice, result))
+    failures = {job_id: errors[payload["ref"]] for job_id, payload in items if payload.get("ref") in errors}
+    return failures, partial(_save_documents, documents=documents)
+
+webhook_queue = webhook_queue_from_env(process_focusnfe_webhooks)
+document_queue = webhook_queue_from_env(fetch_invoice_documents, kind=DOCUMENTS)
 
 @router.post("/focusnfe")
 async def focusnfe_webhook(
     request: Request, 
-    background_tasks: BackgroundTasks, 
     db: Session = Depends(get_db)
 ):
     """
-    Recebe e processa notificações de status da FocusNFE.
+    Recebe notificações de status da FocusNFE.
+    Grava o log e o job da fila na mesma transação e responde; o
+    processamento é feito pelos workers de `webhook_queue`. Reenvios
+    idênticos (mesmo `payload_hash`, na mesma geração de reenvio da nota)
+    são confirmados sem novo log nem job.
     """
     payload = await request.json()
+    content_hash = payload_hash(payload, resend_generation(db, payload))
     
-    # Log imediato
-    new_log = WebhookLog(payload=payload)
-    db.add(new_log)
-    db.commit()
+    if db.query(WebhookLog.id).filter(WebhookLog.payload_hash == content_hash).first() is not None:
+        WEBHOOK_IGNORED.inc(reason="duplicate")
+        return {"status": "duplicate"}
     
-    # Processamento pesado em background
-    background_tasks.add_task(process_focusnfe_webhook, payload, db)
+    # Log + job da fila (persistentes antes da confirmação)
+    new_log = WebhookLog(payload=payload, payload_hash=content_hash)
+    db.add(new_log)
+    webhook_queue.enqueue(db, new_log)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Reenvio simultâneo: o outro request gravou o mesmo hash primeiro
+        db.rollback()
+        WEBHOOK_IGNORED.inc(reason="duplicate")
+        return {"status": "duplicate"}
+    webhook_queue.notify()
     
     return {"status": "received"}
@@ -0,0 +1,27 @@
+import sys
+import os
+import argparse
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.focus_nfe.database import SessionLocal, init_db
+from modules.focus_nfe.fiscal import backfill_fiscal_fields
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Preenche as colunas fiscais (emitente, destinatário, chave, número, valor, data) de invoices"
+    )
+    parser.add_argument("--batch-size", type=int, default=1_000, help="Notas por lote (um commit por lote)")
+    parser.add_argument("--all", action="store_true", help="Reprocessa também as notas já preenchidas")
+    args = parser.parse_args()
+
+    # init_db adiciona as colunas e índices que faltarem em bancos antigos
+    init_db()
+    with SessionLocal() as db:
+        total = backfill_fiscal_fields(db, batch_size=args.batch_size, only_missing=not args.all)
+
+    print(f"✅ Colunas fiscais preenchidas em {total} notas.")
+
+if __name__ == "__main__":
+    main()
@@ -31,12 +31,46 @@ def emit(doc_type, ref, payload_file, token):
     except Exception as e:
         print(f"Falha na conexão: {e}")
 
+def emit_batch(doc_type, batch_file, token, concurrency=None):
+    """Envia um arquivo com uma lista de {ref, payload} para o endpoint de lote."""
+    url = f"{BASE_URL}/api/{doc_type}/batch"
+
+    headers = {}
+    if token:
+        headers["X-Focus-Token"] = token
+
+    with open(batch_file, 'r') as f:
+        items = json.load(f)
+
+    params = {"concurrency": concurrency} if concurrency else {}
+    print(f"Enviando lote de {len(items)} {doc_type} para {url}...")
+
+    try:
+        response = requests.post(url, json=items, params=params, headers=headers)
+        if response.status_code != 200:
+            print(f"Erro {response.status_code}: {response.text}")
+            return
+        results = response.json()
+        failures = [r for r in results if not r["ok"]]
+        print(f"Sucesso: {len(results) - len(failures)} | Falhas: {len(failures)}")
+        for r in failures:
+            print(f"  {r['ref']}: {r['status_code']} {json.dumps(r['response'], ensure_ascii=False)}")
+    except Exception as e:
+        print(f"Falha na conexão: {e}")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Utilitário para emissão de notas via Hub FocusNFE")
     parser.add_argument("type", choices=["nfse", "nfe", "nfce", "cte", "mdfe"], help="Tipo de documento")
-    parser.add_argument("ref", help="Referência única da nota")
+    parser.add_argument("ref", nargs="?", help="Referência única da nota (não usado com --batch)")
     parser.add_argument("file", help="Caminho para o arquivo JSON com os dados da nota")
     parser.add_argument("--token", help="Token FocusNFe (opcional, sobrescreve .env)")
+    parser.add_argument("--batch", action="store_true", help="O arquivo contém uma lista de {ref, payload} para emissão em lote")
+    parser.add_argument("--concurrency", type=int, help="Envios simultâneos no lote (padrão do servidor)")
     
     args = parser.parse_args()
-    emit(args.type, args.ref, args.file, args.token)
+    if args.batch:
+        emit_batch(args.type, args.file, args.token, args.concurrency)
+    elif not args.ref:
+        parser.error("informe a referência da nota (ou use --batch)")
+    else:
+        emit(args.type, args.ref, args.file, args.token)
@@ -20,7 +20,7 @@ def main():
     parser = argparse.ArgumentParser(description="Ferramenta de Homologação FocusNFE")
     parser.add_argument(
         "--type", 
-        choices=["nfse", "nfe", "nfce", "cte", "mdfe", "lifecycle", "all"],
+        choices=["nfse", "nfe", "nfce", "cte", "mdfe", "batch", "lifecycle", "all"],
         default="all",
         help="Tipo de documento ou teste para homologar"
     )
@@ -34,6 +34,7 @@ def main():
         "nfce": "test_focus_nfce_emission.py",
         "cte": "test_focus_cte_emission.py",
         "mdfe": "test_focus_mdfe_emission.py",
+        "batch": "test_focus_batch_emission.py",
         "lifecycle": "test_full_lifecycle.py"
     }
 
@@ -0,0 +1,34 @@
+import sys
+import os
+import argparse
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.focus_nfe.compression import COMPRESSIBLE_EXTENSIONS, brotli, precompress_tree
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Gera irmãos .gz (e .br, com o pacote brotli) dos assets do dashboard e dos XMLs do storage"
+    )
+    parser.add_argument(
+        "paths", nargs="*",
+        default=[os.path.join(ROOT, "dashboard", "dist"), os.path.join(ROOT, "storage")],
+        help="Diretórios a processar (padrão: dashboard/dist e storage)",
+    )
+    parser.add_argument("--min-size", type=int, default=1024, help="Arquivos menores que isso não são comprimidos")
+    args = parser.parse_args()
+
+    if brotli is None:
+        print("ℹ️  Pacote brotli não instalado: gerando apenas .gz.")
+    for path in args.paths:
+        if not os.path.isdir(path):
+            print(f"⚠️  {path} não existe; ignorado.")
+            continue
+        written = precompress_tree(path, COMPRESSIBLE_EXTENSIONS, args.min_size)
+        print(f"✅ {path}: {len(written)} arquivos comprimidos.")
+
+if __name__ == "__main__":
+    main()
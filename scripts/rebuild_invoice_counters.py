@@ -0,0 +1,30 @@
+import sys
+import os
+import argparse
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.focus_nfe.database import SessionLocal, init_db
+from modules.focus_nfe.counters import read_stats, rebuild_counters
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recalcula a tabela invoice_counters (estatísticas do dashboard) a partir de invoices"
+    )
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Linhas lidas por lote")
+    args = parser.parse_args()
+
+    init_db()
+    with SessionLocal() as db:
+        before = read_stats(db)
+        total = rebuild_counters(db, batch_size=args.batch_size)
+        after = read_stats(db)
+
+    print(f"✅ Contadores recalculados a partir de {total} notas.")
+    for status in sorted(set(before) | set(after)):
+        marker = "" if before.get(status, 0) == after.get(status, 0) else "  (corrigido)"
+        print(f"   {status}: {before.get(status, 0)} -> {after.get(status, 0)}{marker}")
+
+if __name__ == "__main__":
+    main()
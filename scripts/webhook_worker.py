@@ -0,0 +1,42 @@
+import sys
+import os
+import argparse
+import asyncio
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.focus_nfe.focus_client import _load_dotenv_if_present
+from modules.focus_nfe.database import init_db
+from modules.focus_nfe.client_pool import focus_client_pool
+from modules.focus_nfe.webhooks import webhook_queue, document_queue
+
+async def run(workers: int):
+    webhook_queue.workers = document_queue.workers = workers
+    webhook_queue.start()
+    document_queue.start()
+    focus_client_pool.start()
+    print(f"🚀 {workers} workers drenando as filas de webhooks e documentos (Ctrl+C para sair).")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await webhook_queue.stop()
+        await document_queue.stop()
+        await focus_client_pool.aclose()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Processa a fila de webhooks fora da API (use FOCUS_NFE_WEBHOOK_WORKERS=0 na API)"
+    )
+    parser.add_argument("--workers", type=int, default=max(1, webhook_queue.workers), help="Workers assíncronos")
+    args = parser.parse_args()
+
+    _load_dotenv_if_present()
+    init_db()
+    try:
+        asyncio.run(run(args.workers))
+    except KeyboardInterrupt:
+        print("👋 Workers encerrados.")
+
+if __name__ == "__main__":
+    main()
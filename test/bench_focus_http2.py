@@ -0,0 +1,101 @@
+"""
+Benchmark do transporte do AsyncFocusNFeClient: HTTP/1.1 (pool) x HTTP/2.
+
+Dispara requisições concorrentes contra a Focus (ou um stand-in local) e
+mede vazão e latência para cada nível de concorrência.
+
+Uso:
+    python test/bench_focus_http2.py --base-url https://homologacao.focusnfe.com.br \
+        --token SEU_TOKEN --concurrency 1 10 50 100 --requests 500
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from modules.focus_nfe.focus_client import AsyncFocusNFeClient
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _run(client, total, concurrency, emit, doc_type):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if emit:
+                    response = await client.create_document(doc_type, f"BENCH-{uuid.uuid4().hex[:10]}", {"bench": i})
+                else:
+                    response = await client.consultar_municipio("3550308")
+                if not response.ok:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    return {
+        "rps": total / elapsed,
+        "p50": _percentile(latencies, 50) * 1000,
+        "p95": _percentile(latencies, 95) * 1000,
+        "mean": statistics.mean(latencies) * 1000,
+        "errors": errors,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTTP/1.1 x HTTP/2 para a API Focus")
+    parser.add_argument("--base-url", default=os.getenv("FOCUS_NFE_BASE_URL"))
+    parser.add_argument("--token", default=os.getenv("FOCUS_NFE_TOKEN"))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--requests", type=int, default=500, help="Requisições por rodada")
+    parser.add_argument("--max-connections", type=int, default=20, help="Conexões do pool HTTP/1.1")
+    parser.add_argument("--h2-connections", type=int, default=1, help="Conexões do pool HTTP/2")
+    parser.add_argument("--max-streams", type=int, default=100, help="Streams por conexão HTTP/2")
+    parser.add_argument("--emit", action="store_true", help="Usa POST /v2/{doc}?ref= em vez de consultar município")
+    parser.add_argument("--doc", default="nfe")
+    args = parser.parse_args()
+
+    modes = {
+        "http1.1": dict(limits=httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)),
+        "http2": dict(
+            limits=httpx.Limits(max_connections=args.h2_connections, max_keepalive_connections=args.h2_connections),
+            http2=True,
+            max_streams=args.max_streams,
+        ),
+    }
+
+    print(f"{'modo':<8} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'média ms':>9} {'erros':>6}")
+    for concurrency in args.concurrency:
+        for mode, options in modes.items():
+            async with AsyncFocusNFeClient(token=args.token, base_url=args.base_url, **options) as client:
+                # Aquece o pool antes de medir
+                await _run(client, min(concurrency, args.requests), concurrency, args.emit, args.doc)
+                result = await _run(client, args.requests, concurrency, args.emit, args.doc)
+            print(
+                f"{mode:<8} {concurrency:>5} {result['rps']:>9.1f} {result['p50']:>8.1f} "
+                f"{result['p95']:>8.1f} {result['mean']:>9.1f} {result['errors']:>6}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,329 @@
+"""
+Stand-in local da API Focus NFe v2, para testes de carga e desenvolvimento
+sem depender do ambiente de homologação.
+
+Suporta emissão (POST /v2/{tipo}?ref=), consulta, download de .pdf/.xml,
+cancelamento (DELETE), listagem paginada, requisitos de município e
+gatilhos (/v2/hooks). Após a emissão, a nota passa a "autorizado" depois de
+`--authorize-after` segundos e, se houver URL de webhook, a notificação é
+enviada como a Focus faria (também no cancelamento). `POST
+/__fake__/reject/{tipo}/{ref}` simula a rejeição (`erro_autorizacao`); como
+na Focus, uma nota rejeitada pode ser reenviada com o mesmo ref.
+
+Latência, taxa de erros 5xx e limite de requisições por token são
+configuráveis pela linha de comando ou em tempo de execução:
+
+    python test/fake_focus_server.py --port 9000 --latency-ms 80 --jitter-ms 40 \
+        --error-rate 0.02 --webhook-url http://localhost:8000/api/webhooks/focusnfe
+
+    curl -X POST localhost:9000/__fake__/config -d '{"latency_ms": 300}'
+    curl localhost:9000/__fake__/stats
+
+Para apontar a API local para o stand-in:
+    FOCUS_NFE_BASE_URL=http://localhost:9000 FOCUS_NFE_TOKEN=fake python main.py
+"""
+
+import argparse
+import asyncio
+import base64
+import itertools
+import os
+import random
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+PDF_BYTES = b"%PDF-1.4\n" + b"0" * 48 * 1024 + b"\n%%EOF\n"
+
+CONFIG: Dict[str, Any] = {
+    "latency_ms": 50.0,          # latência média por requisição
+    "jitter_ms": 0.0,            # variação uniforme (+/-) sobre a latência
+    "error_rate": 0.0,           # fração de respostas 503
+    "rate_limit": 0,             # requisições por minuto por token (0 = sem limite)
+    "authorize_after": 0.5,      # segundos até a nota passar a "autorizado"
+    "webhook_url": None,         # destino padrão das notificações
+}
+
+DOCUMENTS: Dict[tuple, Dict[str, Any]] = {}
+HOOKS: Dict[str, Dict[str, Any]] = {}
+STATS: Counter = Counter()
+_windows: Dict[str, list] = {}
+_ids = itertools.count(1)
+_background: set = set()
+_http: Optional[httpx.AsyncClient] = None
+
+app = FastAPI(title="Focus NFe (stand-in)")
+
+
+@app.on_event("startup")
+async def _startup():
+    global _http
+    _http = httpx.AsyncClient(timeout=10.0)
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    await _http.aclose()
+
+
+def _token(request: Request) -> str:
+    auth = request.headers.get("authorization", "")
+    if auth.lower().startswith("basic "):
+        try:
+            return base64.b64decode(auth[6:]).decode().split(":", 1)[0]
+        except ValueError:
+            pass
+    return request.query_params.get("token", "")
+
+
+def _rate_limit(token: str):
+    """Janela fixa de 60 s por token. Retorna (headers, excedido)."""
+    limit = int(CONFIG["rate_limit"])
+    if not limit:
+        return {}, False
+    now = time.time()
+    window = _windows.setdefault(token, [now, 0])
+    if now - window[0] >= 60:
+        window[0], window[1] = now, 0
+    window[1] += 1
+    reset = max(0, int(60 - (now - window[0])))
+    headers = {
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(max(0, limit - window[1])),
+        "X-RateLimit-Reset": str(reset),
+    }
+    return headers, window[1] > limit
+
+
+@app.middleware("http")
+async def _simulate_network(request: Request, call_next):
+    if request.url.path.startswith("/__fake__"):
+        return await call_next(request)
+
+    STATS["requests"] += 1
+    latency = CONFIG["latency_ms"] + random.uniform(-1, 1) * CONFIG["jitter_ms"]
+    if latency > 0:
+        await asyncio.sleep(latency / 1000)
+
+    headers, exceeded = _rate_limit(_token(request))
+    if exceeded:
+        STATS["429"] += 1
+        headers["Retry-After"] = headers["X-RateLimit-Reset"]
+        return JSONResponse({"codigo": "limite_excedido", "mensagem": "Limite de requisições atingido"}, 429, headers)
+    if random.random() < CONFIG["error_rate"]:
+        STATS["503"] += 1
+        return JSONResponse({"codigo": "erro_interno", "mensagem": "Erro simulado"}, 503, headers)
+
+    response = await call_next(request)
+    response.headers.update(headers)
+    return response
+
+
+# --- Notificações -----------------------------------------------------------
+
+def _webhook_targets(doc_type: str):
+    urls = [hook["url"] for hook in HOOKS.values() if hook["event"] == doc_type]
+    if not urls and CONFIG["webhook_url"]:
+        urls = [CONFIG["webhook_url"]]
+    return urls
+
+
+async def _notify(doc_type: str, document: Dict[str, Any]):
+    for url in _webhook_targets(doc_type):
+        try:
+            await _http.post(url, json=document)
+            STATS["webhooks_sent"] += 1
+        except httpx.HTTPError:
+            STATS["webhooks_failed"] += 1
+
+
+async def _authorize_later(doc_type: str, ref: str):
+    await asyncio.sleep(CONFIG["authorize_after"])
+    document = DOCUMENTS.get((doc_type, ref))
+    if document is None or document["status"] != "processando_autorizacao":
+        return
+    document.update(
+        status="autorizado",
+        status_sefaz="100",
+        mensagem_sefaz="Autorizado o uso da NF-e",
+        chave_nfe=f"NFe{random.randrange(10**43, 10**44)}",
+        numero=str(next(_ids)),
+        serie="1",
+        caminho_danfe=f"/v2/{doc_type}/{ref}.pdf",
+        caminho_xml_nota_fiscal=f"/v2/{doc_type}/{ref}.xml",
+    )
+    await _notify(doc_type, document)
+
+
+def _spawn(coro):
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+# --- Controle do stand-in ---------------------------------------------------
+
+@app.get("/__fake__/stats")
+async def fake_stats():
+    return {"documents": len(DOCUMENTS), **STATS}
+
+
+@app.post("/__fake__/config")
+async def fake_config(request: Request):
+    CONFIG.update(await request.json())
+    return CONFIG
+
+
+@app.post("/__fake__/reject/{doc_type}/{ref}")
+async def fake_reject(doc_type: str, ref: str):
+    document = DOCUMENTS.get((doc_type, ref))
+    if document is None:
+        return JSONResponse({"codigo": "nao_encontrado", "mensagem": "Nota fiscal não encontrada"}, 404)
+    document.update(status="erro_autorizacao", status_sefaz="225", mensagem_sefaz="Rejeição: Falha no Schema XML")
+    await _notify(doc_type, document)
+    return document
+
+
+@app.post("/__fake__/reset")
+async def fake_reset():
+    DOCUMENTS.clear()
+    HOOKS.clear()
+    STATS.clear()
+    _windows.clear()
+    return {"status": "ok"}
+
+
+# --- Gatilhos (webhooks) ----------------------------------------------------
+
+@app.post("/v2/hooks")
+async def create_hook(request: Request):
+    data = await request.json()
+    hook = {"id": uuid.uuid4().hex[:12], "event": data.get("event", "nfe"), "url": data["url"], "cnpj": data.get("cnpj")}
+    HOOKS[hook["id"]] = hook
+    return hook
+
+
+@app.get("/v2/hooks")
+async def list_hooks():
+    return list(HOOKS.values())
+
+
+@app.get("/v2/hooks/{hook_id}")
+async def get_hook(hook_id: str):
+    hook = HOOKS.get(hook_id)
+    if hook is None:
+        return JSONResponse({"codigo": "nao_encontrado", "mensagem": "Gatilho não encontrado"}, 404)
+    return hook
+
+
+@app.delete("/v2/hooks/{hook_id}")
+async def delete_hook(hook_id: str):
+    hook = HOOKS.pop(hook_id, None)
+    if hook is None:
+        return JSONResponse({"codigo": "nao_encontrado", "mensagem": "Gatilho não encontrado"}, 404)
+    return {**hook, "deleted": True}
+
+
+# --- Municípios -------------------------------------------------------------
+
+@app.get("/v2/municipios/{ibge}")
+async def get_municipio(ibge: str):
+    return {
+        "codigo_municipio": ibge,
+        "nome_municipio": "Município de Teste",
+        "sigla_uf": "SP",
+        "nfse_habilitada": True,
+        "requer_certificado_nfse": False,
+        "possui_ambiente_homologacao_nfse": True,
+    }
+
+
+# --- Documentos -------------------------------------------------------------
+
+@app.post("/v2/{doc_type}")
+async def create_document(doc_type: str, ref: str, request: Request):
+    payload = await request.json()
+    key = (doc_type, ref)
+    if key in DOCUMENTS and DOCUMENTS[key]["status"] != "erro_autorizacao":
+        return JSONResponse({"codigo": "already_processed", "mensagem": "Nota fiscal já processada"}, 422)
+    document = {
+        "id": str(next(_ids)),
+        "ref": ref,
+        "referencia": ref,
+        "cnpj_emitente": (payload.get("prestador") or {}).get("cnpj") or payload.get("cnpj_emitente"),
+        "status": "processando_autorizacao",
+    }
+    DOCUMENTS[key] = document
+    STATS["created"] += 1
+    if CONFIG["authorize_after"] is not None and CONFIG["authorize_after"] >= 0:
+        _spawn(_authorize_later(doc_type, ref))
+    return JSONResponse(document, 202)
+
+
+@app.get("/v2/{doc_type}")
+async def list_documents(doc_type: str, pagina: int = 1, limite: int = 50):
+    documents = [doc for (kind, _), doc in DOCUMENTS.items() if kind == doc_type]
+    start = (pagina - 1) * limite
+    return JSONResponse(documents[start:start + limite], headers={"X-Total-Count": str(len(documents))})
+
+
+@app.get("/v2/{doc_type}/{name}")
+async def get_document(doc_type: str, name: str):
+    ref, _, ext = name.rpartition(".") if name.endswith((".pdf", ".xml")) else (name, "", "")
+    document = DOCUMENTS.get((doc_type, ref))
+    if document is None:
+        return JSONResponse({"codigo": "nao_encontrado", "mensagem": "Nota fiscal não encontrada"}, 404)
+    if ext == "pdf":
+        STATS["pdf_downloads"] += 1
+        return Response(PDF_BYTES, media_type="application/pdf")
+    if ext == "xml":
+        STATS["xml_downloads"] += 1
+        xml = f'<?xml version="1.0"?><nfeProc><NFe><infNFe Id="{document.get("chave_nfe", "")}"/></NFe></nfeProc>'
+        return Response(xml.encode(), media_type="application/xml")
+    return document
+
+
+@app.delete("/v2/{doc_type}/{ref}")
+async def cancel_document(doc_type: str, ref: str, request: Request):
+    document = DOCUMENTS.get((doc_type, ref))
+    if document is None:
+        return JSONResponse({"codigo": "nao_encontrado", "mensagem": "Nota fiscal não encontrada"}, 404)
+    if document["status"] != "autorizado":
+        return JSONResponse({"codigo": "requisicao_invalida", "mensagem": "Nota não autorizada"}, 422)
+    document.update(status="cancelado", status_sefaz="135", mensagem_sefaz="Evento registrado e vinculado a NF-e")
+    STATS["cancelled"] += 1
+    _spawn(_notify(doc_type, document))
+    return document
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in local da API Focus NFe v2")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("FAKE_FOCUS_PORT", 9000)))
+    parser.add_argument("--latency-ms", type=float, default=CONFIG["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=CONFIG["jitter_ms"])
+    parser.add_argument("--error-rate", type=float, default=CONFIG["error_rate"], help="Fração de respostas 503 (0 a 1)")
+    parser.add_argument("--rate-limit", type=int, default=CONFIG["rate_limit"], help="Requisições/minuto por token (0 = sem limite)")
+    parser.add_argument("--authorize-after", type=float, default=CONFIG["authorize_after"], help="Segundos até autorizar (negativo = nunca)")
+    parser.add_argument("--webhook-url", default=None, help="Ex: http://localhost:8000/api/webhooks/focusnfe")
+    args = parser.parse_args()
+
+    CONFIG.update(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        authorize_after=args.authorize_after,
+        webhook_url=args.webhook_url,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""
+Benchmark de carga ponta a ponta da API local (`main:app`).
+
+Gera carga em malha aberta (taxa fixa de chegada, `--rps`) para cada cenário
+e mede a latência a partir do instante agendado de cada requisição, de modo
+que filas dentro da API aparecem nos percentis em vez de reduzir a carga.
+
+Cenários:
+    emission      POST /api/nfe/?ref=...          (emissão + gravação local)
+    consultation  GET  /api/nfe/{ref}             (refs emitidas no cenário anterior ou no aquecimento)
+    webhook       POST /api/webhooks/focusnfe     (confirmação + download de PDF/XML em background)
+
+No cenário de webhook também é medido o processamento em background: com
+`--start`, o tempo até todos os jobs da fila (`webhook_jobs`) terminarem;
+contra servidores externos, até o stand-in registrar os downloads de PDF e
+XML de todas as notas (webhooks repetidos da mesma ref são coalescidos pela
+fila, então nesse modo a medição só é exata com refs distintas).
+
+Uso com servidores iniciados pelo próprio script (stand-in em test/fake_focus_server.py):
+    python test/load_benchmark.py --start --rps 50 --duration 20 --latency-ms 80
+
+Contra servidores já em execução:
+    python test/load_benchmark.py --api-url http://localhost:8000 --fake-url http://localhost:9000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+NFE_PAYLOAD = {
+    "natureza_operacao": "Venda de mercadoria",
+    "tipo_documento": 1,
+    "items": [
+        {
+            "numero_item": "1",
+            "codigo_produto": "PROD001",
+            "descricao": "Produto de Teste de Carga",
+            "cfop": "5102",
+            "unidade_comercial": "UN",
+            "quantidade_comercial": 1.0,
+            "valor_unitario_comercial": 100.0,
+            "valor_bruto": 100.0,
+            "valor_total": 100.0,
+            "ncm": "62034200",
+            "icms_origem": "0",
+            "icms_situacao_tributaria": "102",
+            "pis_situacao_tributaria": "07",
+            "cofins_situacao_tributaria": "07"
+        }
+    ],
+    "prestador": {"cnpj": "12345678000199", "codigo_municipio": "3550308"},
+    "tomador": {
+        "cnpj": "98765432000110",
+        "razao_social": "Comprador de Teste",
+        "endereco": {
+            "logradouro": "Rua de Entrega",
+            "numero": "500",
+            "bairro": "Industrial",
+            "codigo_municipio": "3550308",
+            "uf": "SP",
+            "cep": "01001000"
+        }
+    }
+}
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_until_up(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Servidor em {url} não respondeu em {timeout:.0f}s")
+
+
+def _start_servers(args, workdir):
+    fake_port, api_port = _free_port(), _free_port()
+    fake = subprocess.Popen(
+        [
+            sys.executable, os.path.join(ROOT, "test", "fake_focus_server.py"),
+            "--port", str(fake_port),
+            "--latency-ms", str(args.latency_ms),
+            "--jitter-ms", str(args.jitter_ms),
+            "--error-rate", str(args.error_rate),
+            "--authorize-after", "-1",
+        ],
+        cwd=ROOT,
+    )
+    env = {
+        **os.environ,
+        "FOCUS_NFE_BASE_URL": f"http://127.0.0.1:{fake_port}",
+        "FOCUS_NFE_TOKEN": "load-benchmark",
+        # O stand-in não limita requisições; o rate limit local não deve distorcer a medição
+        "FOCUS_NFE_RATE_LIMIT": "1000000",
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'load_benchmark.db')}",
+        "STORAGE_PATH": os.path.join(workdir, "invoices"),
+    }
+    api = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--port", str(api_port),
+            "--workers", str(args.workers),
+            "--log-level", "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+    return [fake, api], f"http://127.0.0.1:{api_port}", f"http://127.0.0.1:{fake_port}"
+
+
+async def _drive(rps, duration, send):
+    """Dispara `send(i)` em taxa fixa e retorna (latências ok, erros, duração total)."""
+    loop = asyncio.get_running_loop()
+    total = max(1, int(rps * duration))
+    latencies, errors = [], []
+
+    async def one(i, scheduled):
+        try:
+            ok, detail = await send(i)
+        except httpx.HTTPError as e:
+            ok, detail = False, type(e).__name__
+        if ok:
+            latencies.append(loop.time() - scheduled)
+        else:
+            errors.append(detail)
+
+    tasks = []
+    started = loop.time()
+    for i in range(total):
+        scheduled = started + i / rps
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i, scheduled)))
+    await asyncio.gather(*tasks)
+    return latencies, errors, loop.time() - started
+
+
+def _summary(name, latencies, errors, elapsed, target_rps):
+    sent = len(latencies) + len(errors)
+    return {
+        "scenario": name,
+        "target_rps": target_rps,
+        "sent": sent,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "error_kinds": dict(sorted({e: errors.count(e) for e in set(errors)}.items())),
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+    }
+
+
+async def _emit(client, run_id, i, refs):
+    ref = f"LOAD-{run_id}-{i}"
+    response = await client.post("/api/nfe/", params={"ref": ref}, json=NFE_PAYLOAD)
+    if response.status_code == 200:
+        refs.append(ref)
+        return True, None
+    return False, str(response.status_code)
+
+
+async def _fake_downloads(fake_url):
+    async with httpx.AsyncClient(base_url=fake_url) as client:
+        stats = (await client.get("/__fake__/stats")).json()
+    return stats.get("pdf_downloads", 0) + stats.get("xml_downloads", 0)
+
+
+def _webhook_jobs_finished(db_path):
+    with sqlite3.connect(db_path) as con:
+        row = con.execute(
+            "SELECT COUNT(*) FROM webhook_jobs WHERE status IN ('done', 'failed')"
+            " AND (kind IS NULL OR kind = 'webhook')"
+        ).fetchone()
+    return row[0]
+
+
+def _document_jobs_pending(db_path):
+    with sqlite3.connect(db_path) as con:
+        row = con.execute(
+            "SELECT COUNT(*) FROM webhook_jobs WHERE kind = 'documents' AND status IN ('pending', 'processing')"
+        ).fetchone()
+    return row[0]
+
+
+async def run(args):
+    processes = []
+    api_url, fake_url = args.api_url, args.fake_url
+    workdir = tempfile.mkdtemp(prefix="load_benchmark_")
+    try:
+        if args.start:
+            processes, api_url, fake_url = _start_servers(args, workdir)
+            await _wait_until_up(f"{fake_url}/__fake__/stats")
+        await _wait_until_up(f"{api_url}/")
+
+        run_id = uuid.uuid4().hex[:8]
+        limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+        results = []
+        refs = []
+
+        async with httpx.AsyncClient(base_url=api_url, limits=limits, timeout=args.timeout) as client:
+            # Consultas e webhooks precisam de notas existentes
+            if "emission" not in args.scenarios:
+                for i in range(args.seed):
+                    await _emit(client, run_id, f"seed-{i}", refs)
+
+            for scenario in args.scenarios:
+                if scenario == "emission":
+                    async def send(i):
+                        return await _emit(client, run_id, i, refs)
+
+                elif scenario == "consultation":
+                    if not refs:
+                        print("⚠️  Sem notas para consultar; cenário ignorado.")
+                        continue
+                    seeded = list(refs)
+
+                    async def send(i):
+                        response = await client.get(f"/api/nfe/{seeded[i % len(seeded)]}")
+                        return response.status_code == 200, str(response.status_code)
+
+                elif scenario == "webhook":
+                    if not refs:
+                        print("⚠️  Sem notas para notificar; cenário ignorado.")
+                        continue
+                    seeded = list(refs)
+                    db_path = os.path.join(workdir, "load_benchmark.db") if args.start else None
+                    jobs_before = _webhook_jobs_finished(db_path) if db_path else 0
+                    downloads_before = await _fake_downloads(fake_url) if fake_url else 0
+
+                    async def send(i):
+                        payload = {"ref": seeded[i % len(seeded)], "status": "autorizado", "id": str(i)}
+                        response = await client.post("/api/webhooks/focusnfe", json=payload)
+                        return response.status_code == 200, str(response.status_code)
+
+                latencies, errors, elapsed = await _drive(args.rps, args.duration, send)
+                summary = _summary(scenario, latencies, errors, elapsed, args.rps)
+
+                if scenario == "webhook" and db_path:
+                    # Aguarda a fila terminar todos os jobs (um por webhook) e os downloads de documentos
+                    expected = jobs_before + summary["ok"]
+                    drain_started = time.monotonic()
+                    done = _webhook_jobs_finished(db_path)
+                    while (
+                        done < expected or _document_jobs_pending(db_path)
+                    ) and time.monotonic() - drain_started < args.drain_timeout:
+                        await asyncio.sleep(0.2)
+                        done = _webhook_jobs_finished(db_path)
+                    drained = elapsed + (time.monotonic() - drain_started)
+                    summary["processed"] = done - jobs_before
+                    summary["processing_s"] = drained
+                    summary["processing_rps"] = summary["processed"] / drained if drained else 0.0
+                elif scenario == "webhook" and fake_url:
+                    # Aguarda o processamento em background (PDF + XML por webhook)
+                    expected = downloads_before + 2 * summary["ok"]
+                    drain_started = time.monotonic()
+                    done = await _fake_downloads(fake_url)
+                    while done < expected and time.monotonic() - drain_started < args.drain_timeout:
+                        await asyncio.sleep(0.2)
+                        done = await _fake_downloads(fake_url)
+                    drained = elapsed + (time.monotonic() - drain_started)
+                    summary["processed"] = (done - downloads_before) // 2
+                    summary["processing_s"] = drained
+                    summary["processing_rps"] = summary["processed"] / drained if drained else 0.0
+
+                results.append(summary)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    print(f"\n{'cenário':<13} {'alvo':>6} {'ok':>6} {'erros':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for r in results:
+        print(
+            f"{r['scenario']:<13} {r['target_rps']:>6.0f} {r['ok']:>6} {r['errors']:>6} {r['throughput_rps']:>8.1f} "
+            f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+        )
+        if r["error_kinds"]:
+            print(f"{'':<13} erros: {r['error_kinds']}")
+        if "processed" in r:
+            print(f"{'':<13} processamento em background: {r['processed']} webhooks em {r['processing_s']:.1f}s ({r['processing_rps']:.1f}/s)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados salvos em {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga ponta a ponta da API local")
+    parser.add_argument("--start", action="store_true", help="Inicia o stand-in da Focus e a API em portas livres")
+    parser.add_argument("--api-url", default="http://localhost:8000")
+    parser.add_argument("--fake-url", default=None, help="URL do stand-in, para medir o processamento dos webhooks")
+    parser.add_argument("--scenarios", nargs="+", choices=["emission", "consultation", "webhook"],
+                        default=["emission", "consultation", "webhook"])
+    parser.add_argument("--rps", type=float, default=20.0, help="Taxa de chegada alvo por cenário")
+    parser.add_argument("--duration", type=float, default=10.0, help="Duração de cada cenário em segundos")
+    parser.add_argument("--connections", type=int, default=200, help="Conexões máximas do gerador de carga")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=20, help="Notas emitidas antes, se o cenário de emissão não rodar")
+    parser.add_argument("--drain-timeout", type=float, default=60.0)
+    parser.add_argument("--workers", type=int, default=1, help="Workers do uvicorn (com --start)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latência do stand-in (com --start)")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Variação da latência do stand-in (com --start)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de 503 do stand-in (com --start)")
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import requests
+import json
+import uuid
+
+BASE_URL = "http://localhost:8001/api"
+
+def test_emit_batch_nfse():
+    prefix = f"LOTE-{uuid.uuid4().hex[:6]}"
+    print(f"=== Testando emissão em lote de NFSe (PREFIXO: {prefix}) ===")
+
+    payload = {
+        "prestador": {
+            "cnpj": "12345678000199",
+            "codigo_municipio": "3550308"
+        },
+        "tomador": {
+            "cpf": "12345678901",
+            "razao_social": "Cliente de Teste em Lote",
+            "endereco": {
+                "logradouro": "Rua de Teste",
+                "numero": "100",
+                "bairro": "Centro",
+                "codigo_municipio": "3550308",
+                "uf": "SP",
+                "cep": "01001000"
+            }
+        },
+        "servico": {
+            "aliquota": 2.0,
+            "discriminacao": "Serviço de teste em lote",
+            "item_lista_servico": "0107",
+            "valor_servicos": 10.0
+        }
+    }
+    items = [{"ref": f"{prefix}-{i}", "payload": payload} for i in range(5)]
+    # Item inválido: deve voltar com 422 sem afetar os demais
+    items.append({"ref": f"{prefix}-invalido", "payload": {"servico": {}}})
+
+    try:
+        response = requests.post(f"{BASE_URL}/nfse/batch?concurrency=3", json=items, timeout=60)
+        if response.status_code == 200:
+            results = response.json()
+            ok = sum(1 for r in results if r["ok"])
+            print(f"Lote processado: {ok}/{len(results)} aceitas.")
+            print(json.dumps(results, indent=2, ensure_ascii=False))
+        else:
+            print(f"Erro no lote: {response.status_code}")
+            print(response.text)
+    except requests.exceptions.ConnectionError:
+        print(f"ERRO: Servidor em {BASE_URL} não encontrado.")
+
+if __name__ == "__main__":
+    test_emit_batch_nfse()
@@ -0,0 +1,51 @@
+import requests
+import uuid
+
+BASE_URL = "http://localhost:8001/api"
+
+PAYLOAD = {
+    # Data com fuso UTC: precisa gerar o mesmo payload_hash na emissão em lote e na individual
+    "data_emissao": "2025-03-10T12:30:00Z",
+    "prestador": {
+        "cnpj": "12345678000199",
+        "codigo_municipio": "3550308"
+    },
+    "tomador": {
+        "cpf": "12345678901",
+        "razao_social": "Cliente de Teste de Idempotência",
+        "endereco": {
+            "logradouro": "Rua de Teste",
+            "numero": "100",
+            "bairro": "Centro",
+            "codigo_municipio": "3550308",
+            "uf": "SP",
+            "cep": "01001000"
+        }
+    },
+    "servico": {
+        "aliquota": 2.0,
+        "discriminacao": "Serviço de teste de idempotência",
+        "item_lista_servico": "0107",
+        "valor_servicos": 10.0
+    }
+}
+
+def test_same_payload_through_batch_and_single_emission():
+    ref = f"IDEM-{uuid.uuid4().hex[:6]}"
+    print(f"=== Testando idempotência lote -> avulsa com data UTC (REF: {ref}) ===")
+
+    try:
+        batch = requests.post(f"{BASE_URL}/nfse/batch", json=[{"ref": ref, "payload": PAYLOAD}], timeout=60)
+        print(f"Lote: {batch.status_code} {batch.text}")
+        assert batch.status_code == 200 and batch.json()[0]["ok"]
+
+        single = requests.post(f"{BASE_URL}/nfse/?ref={ref}", json=PAYLOAD, timeout=60)
+        print(f"Avulsa: {single.status_code} {single.text}")
+        # Mesmo conteúdo: devolve a resposta gravada, sem 409
+        assert single.status_code == 200
+        assert single.json() == batch.json()[0]["response"]
+    except requests.exceptions.ConnectionError:
+        print(f"ERRO: Servidor em {BASE_URL} não encontrado.")
+
+if __name__ == "__main__":
+    test_same_payload_through_batch_and_single_emission()
@@ -0,0 +1,69 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from modules.focus_nfe.models import Base, Invoice
+from modules.focus_nfe.webhooks import _has_documents, _plan_updates, payload_hash, resend_generation
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _plan(db, ref, statuses):
+    """Filtra um lote de webhooks da ref e retorna `(status aplicados, quantidade ignorada)`."""
+    by_ref = {ref: [(job_id, {"ref": ref, "status": status}) for job_id, status in enumerate(statuses, 1)]}
+    [(_, accepted, ignored)] = _plan_updates(db, by_ref)
+    return [payload["status"] for _, payload in accepted], ignored
+
+
+def test_resend_after_authorization_error():
+    db = _session()
+    db.add(Invoice(referencia="ERR-1", type="nfse", status="erro_autorizacao"))
+    db.commit()
+
+    # Reenvio após a rejeição: erro_autorizacao → processando → autorizado, no mesmo lote
+    assert _plan(db, "ERR-1", ["processando_autorizacao", "autorizado"]) == (
+        ["processando_autorizacao", "autorizado"], 0
+    )
+
+    # E em lotes separados, com o status gravado entre eles
+    assert _plan(db, "ERR-1", ["processando_autorizacao"]) == (["processando_autorizacao"], 0)
+    db.query(Invoice).filter(Invoice.referencia == "ERR-1").update({Invoice.status: "processando_autorizacao"})
+    assert _plan(db, "ERR-1", ["autorizado"]) == (["autorizado"], 0)
+
+
+def test_terminal_statuses_ignore_late_updates():
+    db = _session()
+    db.add(Invoice(referencia="CANC-1", type="nfse", status="cancelado"))
+    db.commit()
+
+    assert _plan(db, "CANC-1", ["processando_autorizacao", "erro_autorizacao", "autorizado"]) == ([], 3)
+
+
+def test_download_skip_requires_files_in_storage(tmp_path):
+    pdf_path, xml_path = tmp_path / "REF.pdf", tmp_path / "REF.xml"
+    pdf_path.write_bytes(b"%PDF")
+    invoice = Invoice(referencia="REF", status="autorizado", pdf_url=str(pdf_path), xml_url=str(xml_path))
+
+    # XML registrado, mas ausente do storage: baixa de novo
+    assert not _has_documents(invoice)
+    xml_path.write_text("<nfe/>")
+    assert _has_documents(invoice)
+
+
+def test_duplicate_hash_is_scoped_to_resend_generation():
+    db = _session()
+    db.add(Invoice(referencia="ERR-2", type="nfse", status="erro_autorizacao"))
+    db.commit()
+    payload = {"ref": "ERR-2", "status": "erro_autorizacao", "mensagem": "Rejeição"}
+    first = payload_hash(payload, resend_generation(db, payload))
+
+    # Reenvio do mesmo webhook pela Focus (mesmo conteúdo, outra ordem de chaves): duplicado
+    assert payload_hash(dict(reversed(payload.items())), resend_generation(db, payload)) == first
+
+    # Após o reenvio da nota, a mesma rejeição é uma nova atualização
+    db.query(Invoice).filter(Invoice.referencia == "ERR-2").update({Invoice.resend_count: 1})
+    assert resend_generation(db, payload) == 1
+    assert payload_hash(payload, resend_generation(db, payload)) != first